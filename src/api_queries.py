@@ -2,17 +2,23 @@
 This file will run all of the API queries for each access during the processing of each of the tables
 """
 
+import asyncio
 import json
 import os
 # import urllib.request
 import operator
 import time
-from functools import lru_cache
 
-import requests
 from dotenv import load_dotenv
 from urllib.error import HTTPError
+from fetch_engine import get_fetch_engine
+from match_history_store import get_match_history_store
+from metrics import get_metrics
+from page_cache import get_page_cache
+from pagination_planner import PaginationPlanner
+from player_resolver import get_player_resolver
 from role_rate import RoleRate
+from static_data import get_static_data
 import datetime
 from dateutil.relativedelta import relativedelta
 import cassiopeia
@@ -25,19 +31,25 @@ class APIQueries:
     """
     Run and save each API query
     """
-    def __init__(self, player_list: list, clash_api: bool = False):
+    def __init__(self, player_list: list, clash_api: bool = False, low_priority: bool = False,
+                 query_clash_members: bool = True):
         """
         Run and save each API query
 
         :param player_list: List of each player to process
         :param clash_api: If using the clash api the player list should only contain a single player
+        :param query_clash_members: Query every member of the clash team straight away. When False only the clash team
+                                    is found and query_clash_team must be called to query its members
+        :param low_priority: Leave part of the Riot rate limits for the commands. e.g. when pre-warming
         """
         # Placeholder variables
         self.response = None
         self.champion_info = None
+        self.champion_registry = None
         self.clash_team_id = None
         self.clash_team_members = None
         self.clash_api = clash_api
+        self.low_priority = low_priority
         self.titles = []
         self.saved_positions = {}
         self.player_list = player_list
@@ -88,24 +100,63 @@ class APIQueries:
         self.player_information = {}
 
         self.match_start_epoch_time = int((datetime.datetime.now() - relativedelta(months=6)).timestamp())
+        self.match_window_start = datetime.datetime.fromtimestamp(self.match_start_epoch_time, datetime.timezone.utc)
+
+        # The newest page of a match history changes with every game played while older pages never change
+        self.page_cache = get_page_cache()
+        self.recent_page_ttl = int(os.getenv('OP_GG_RECENT_PAGE_TTL', 60 * 60))
+        self.history_page_ttl = int(os.getenv('OP_GG_HISTORY_PAGE_TTL', 14 * 24 * 60 * 60))
+
+        # Each queue is synced from the newest game stored for the player, keeping up to five pages worth of games
+        # from the last six months. Queues the player does not play are only checked again once a day
+        self.match_history_store = get_match_history_store()
+        self.max_games_per_queue = 100
+        self.match_history_pages = 5
+        self.empty_queue_recheck_interval = 24 * 60 * 60
+        self.match_history_queues = ['SOLORANKED', 'FLEXRANKED', 'NORMAL', 'CLASH']
+        self.ranked_clash_queues = ['SOLORANKED', 'FLEXRANKED', 'CLASH']
+
+        # Op.gg is only asked to refresh a player when it has not done so recently
+        self.op_gg_refresh_interval = int(os.getenv('OP_GG_REFRESH_INTERVAL', 30 * 60))
+        self.op_gg_refresh_timeout = 20
+        self.op_gg_poll_interval = 2
         cassiopeia.set_riot_api_key(os.getenv("RIOT_API"))
 
         # Grab information based on the given player list
+        self.fetch_engine = get_fetch_engine()
+        self.player_resolver = get_player_resolver()
+        self.metrics = get_metrics()
         if self.clash_api:
-            self.use_clash_api()
+            self.fetch_engine.run(self.use_clash_api(query_clash_members))
         else:
-            self.process_each_player()
+            self.fetch_engine.run(self.process_each_player())
 
-    def use_clash_api(self):
+    async def use_clash_api(self, query_clash_members: bool = True):
         """
         Use the clash API based on the given player
+
+        :param query_clash_members: Query every member of the clash team once the team is found
         """
-        self.process_each_player(get_match_history=False)
-        self.get_clash_team_id()
+        await self.process_each_player(get_match_history=False, refresh_op_gg=False)
+        await self.get_clash_team_id()
         for player in self.player_information:
             self.player_information[player]['position'] = [member for member in self.clash_team_members if member['puuid'] == self.player_information[player]['puuid']][0]['position']
+        if query_clash_members:
+            await self.process_clash_team()
+
+    def query_clash_team(self):
+        """
+        Query every member of the clash team found by the clash API. Blocks until every query has finished
+        """
+        self.fetch_engine.run(self.process_clash_team())
+
+    async def process_clash_team(self):
+        """
+        Refresh op.gg and run the API queries for each member of the clash team
+        """
+        await self.refresh_op_gg_data()
         if len(self.errors['no_clash_team']) == 0:
-            self.process_each_clash_member()
+            await self.process_each_clash_member()
             self.get_locked_in_position()
             self.change_order_by_position()
             self.verify_single_player_per_role()
@@ -223,72 +274,154 @@ class APIQueries:
                 if self.player_information[player]['puuid'] == team_member['puuid']:
                     self.player_information[player]['position'] = team_member['position']
 
-    def process_each_clash_member(self):
+    async def process_each_clash_member(self):
         """
         Grab the information from each clash member found
         """
-        for player in self.clash_team_members:
-            # self.get_summoner_id(player['summonerId'])
-            self.get_summoner_object(player['puuid'])
-        for player in self.player_information:
-            self.get_non_random_match_history(player)
-            self.get_player_ranked_clash_match_history(player)
-            self.convert_match_history(player)
-            self.get_player_champion_mastery(player)
-            self.get_ranked_information(player)
+        summoners = await asyncio.gather(*[self.get_summoner_object(player['puuid'])
+                                           for player in self.clash_team_members])
+        for summoner in summoners:
+            self.add_summoner_object(*summoner)
+        await asyncio.gather(*[self.process_player_information(player) for player in self.player_information])
 
-    def refresh_op_gg_data(self):
-        for player in self.player_information:
-            print(f'\tRefreshing OP.GG data for {player}')
-            response = requests.post(f'https://op.gg/lol/summoners/na/{player}-{self.player_information[player]['tagline']}?queue_type=NORMAL',
-                                     data=f'[{{"region":"na","puuid":"{self.player_information[player]['op_gg_puuid']}","isPremiumPrimary":false}}]',
-                                     headers={'Next-Action': '405a04669583947dc03eb8c7f367adf28c8f714e86'})
-            response.raise_for_status()
-            time.sleep(1)
-        time.sleep(20)
+    async def process_player_information(self, player: str):
+        """
+        Run every query for a single player. Each player is independent so this runs alongside the other players
+
+        :param player: Player name
+        """
+        await asyncio.gather(self.get_match_history(player),
+                             self.get_player_champion_mastery(player),
+                             self.get_ranked_information(player))
+        self.convert_match_history(player)
+
+    async def get_match_history(self, player: str):
+        """
+        Get both match histories for the given player. Each queue is only fetched once and the ranked/clash history is
+        filtered out of the full history
+
+        :param player: Player name
+        """
+        await self.get_non_random_match_history(player)
+        self.get_player_ranked_clash_match_history(player)
+
+    async def refresh_op_gg_data(self):
+        """
+        Ask op.gg to refresh every player whose data was not refreshed recently, all at the same time
+        """
+        stale_players = [player for player in self.player_information if not self.op_gg_data_is_fresh(player)]
+        await asyncio.gather(*[self.refresh_op_gg_player(player) for player in stale_players])
+
+    def op_gg_data_is_fresh(self, player: str) -> bool:
+        """
+        Check if op.gg has refreshed the player's data recently, either for us or for someone else
+
+        :param player: Player name
+        """
+        refreshed_at = max(self.match_history_store.get_refreshed_at(self.player_information[player]['op_gg_puuid']),
+                           self.player_information[player].get('op_gg_updated_at') or 0.0)
+        return time.time() - refreshed_at < self.op_gg_refresh_interval
+
+    async def refresh_op_gg_player(self, player: str):
+        """
+        Ask op.gg to refresh the given player and wait until it has finished
+
+        :param player: Player name
+        """
+        print(f'\tRefreshing OP.GG data for {player}')
+        await self.fetch_engine.request(
+            'POST',
+            f'https://op.gg/lol/summoners/na/{player}-{self.player_information[player]["tagline"]}?queue_type=NORMAL',
+            data=f'[{{"region":"na","puuid":"{self.player_information[player]["op_gg_puuid"]}","isPremiumPrimary":false}}]',
+            low_priority=self.low_priority, headers={'Next-Action': '405a04669583947dc03eb8c7f367adf28c8f714e86'})
+        await self.wait_for_op_gg_refresh(player)
+        self.match_history_store.set_refreshed_at(self.player_information[player]['op_gg_puuid'], time.time())
+
+        # The newest page of each queue may have changed with the refresh
+        for queue in self.match_history_queues:
+            self.page_cache.delete(self.get_page_key(*self.get_op_gg_history_request(player, queue, "")))
+
+    async def wait_for_op_gg_refresh(self, player: str):
+        """
+        Poll the player's op.gg page until the time it was last updated changes or the timeout is reached
 
-    def get_clash_team_id(self):
+        :param player: Player name
+        """
+        deadline = time.monotonic() + self.op_gg_refresh_timeout
+        while time.monotonic() < deadline:
+            await asyncio.sleep(self.op_gg_poll_interval)
+            response = await self.fetch_engine.request(
+                'GET', f'https://op.gg/lol/summoners/na/{player}-{self.player_information[player]["tagline"]}'
+                       f'?queue_type=SOLORANKED', self.low_priority)
+            updated_at = self.parse_op_gg_updated_at(response)
+            if updated_at is not None and updated_at != self.player_information[player].get('op_gg_updated_at'):
+                self.player_information[player]['op_gg_updated_at'] = updated_at
+                return
+        print(f'\tTimed out waiting for OP.GG to refresh {player}')
+
+    @staticmethod
+    def parse_op_gg_updated_at(response: str):
+        """
+        Get the time op.gg last updated the summoner from their summoner page
+
+        :param response: Text of the op.gg summoner page
+        :return: Epoch time of the last update, or None if it was not found
+        """
+        summoner = response.split('{\\"puuid\\":\\"')[-1]
+        if '\\"updated_at\\":\\"' not in summoner:
+            return None
+        updated_at = summoner.split('\\"updated_at\\":\\"')[1].split('\\')[0]
+        try:
+            return datetime.datetime.fromisoformat(updated_at).timestamp()
+        except ValueError:
+            return None
+
+    async def get_clash_team_id(self):
         """
         Get the clash team id for the given player
         """
         print(f"Getting clash team ID for: {self.player_list[0]}")
         try:
-
-            clash_team_info = self.get_json(f'{self.base_url_na1}/lol/clash/v1/players/by-puuid/'
-                                            f'{self.player_information[self.player_list[0]]["puuid"]}{self.api_key}')
+            clash_team_id = await self.player_resolver.get_clash_team_id(
+                self.player_information[self.player_list[0]]["puuid"], self.low_priority)
         except HTTPError as e:
             self.errors['no_clash_team'].append(self.player_list[0])
         else:
-            if clash_team_info:
-                self.get_clash_team_players(clash_team_info[0]['teamId'])
+            if clash_team_id is not None:
+                await self.get_clash_team_players(clash_team_id)
             else:
                 self.errors['no_clash_team'].append(self.player_list[0])
 
-    def get_clash_team_players(self, clash_team_id: str):
+    async def get_clash_team_players(self, clash_team_id: str):
         """
         Get the clash team players for the given team id
 
         :param clash_team_id: Id of the clash team to scrape info from
         """
         try:
-            clash_team_info = self.get_json(f'{self.base_url_na1}/lol/clash/v1/teams/{clash_team_id}{self.api_key}')
+            clash_team_info = await self.get_json(f'{self.base_url_na1}/lol/clash/v1/teams/{clash_team_id}{self.api_key}')
         except HTTPError:
             self.errors['no_clash_team'].append(self.player_list[0])
         else:
+            self.clash_team_id = clash_team_id
             self.clash_team_members = clash_team_info['players']
 
-    def process_each_player(self, get_match_history: bool = True):
+    async def process_each_player(self, get_match_history: bool = True, refresh_op_gg: bool = True):
         """
         Run the API queries for each player given
 
-        :param query_type: Type of query to run to grab summoner id information
-        """
-        self.get_all_champion_info()
-        for player in self.player_list:
-            print(f"Processing player: {player}")
-            player = self.get_summoner_id(player)
-            self.get_summoner_object(self.player_information[player]['puuid'], player)
-        self.refresh_op_gg_data()
+        :param get_match_history: If the match history, mastery and ranked information should be gathered as well
+        :param refresh_op_gg: If op.gg should be asked to refresh players whose data is stale
+        """
+        await self.get_all_champion_info()
+        summoner_names = await asyncio.gather(*[self.get_summoner_id(player) for player in self.player_list])
+        found_players = [self.add_summoner_id(summoner_info) for summoner_info in summoner_names if summoner_info]
+        summoners = await asyncio.gather(*[self.get_summoner_object(self.player_information[player]['puuid'], player)
+                                           for player in found_players])
+        for summoner in summoners:
+            self.add_summoner_object(*summoner)
+        if refresh_op_gg:
+            await self.refresh_op_gg_data()
         if get_match_history:
             role_mapping = {
                 0: 'TOP',
@@ -299,11 +432,7 @@ class APIQueries:
             }
             for cnt, player in enumerate(self.player_information):
                 self.player_information[player]['position'] = role_mapping[cnt]
-                self.get_non_random_match_history(player)
-                self.get_player_ranked_clash_match_history(player)
-                self.convert_match_history(player)
-                self.get_player_champion_mastery(player)
-                self.get_ranked_information(player)
+            await asyncio.gather(*[self.process_player_information(player) for player in self.player_information])
         self.cleanup()
 
     def convert_match_history(self, player: str):
@@ -340,7 +469,7 @@ class APIQueries:
         for player in remove:
             self.player_information.pop(player)
 
-    def get_ranked_information(self, player: str):
+    async def get_ranked_information(self, player: str):
         """
         Get the current rank of the given player
 
@@ -348,7 +477,7 @@ class APIQueries:
         """
         print(f"\tGetting ranked information for: {player}")
         try:
-            summoner_info = self.get_json(f'{self.base_url_na1}/lol/league/v4/entries/by-puuid/'
+            summoner_info = await self.get_json(f'{self.base_url_na1}/lol/league/v4/entries/by-puuid/'
                                           f'{self.player_information[player]["puuid"]}{self.api_key}')
         except HTTPError:
             self.errors['no_ranked_info'].append(player)
@@ -379,89 +508,127 @@ class APIQueries:
                 self.player_information[player]['ranked_info']['rank'] = queue_type['rank']
 
 
-    def get_summoner_object(self, puuid: str, player_name: str = None):
+    async def get_summoner_object(self, puuid: str, player_name: str = None) -> tuple:
+        """
+        Get the summoner object and op.gg information for the given player
+
+        :param puuid: Riot puuid of the player
+        :param player_name: Player name if already known
+        :return: The puuid, player name and the information found for the player
+        """
         if player_name is None:
-            player_info = self.get_json(f'{self.base_url}/riot/account/v1/accounts/by-puuid/{puuid}{self.api_key}')
+            player_info = await self.get_json(f'{self.base_url}/riot/account/v1/accounts/by-puuid/{puuid}{self.api_key}')
             player_name = player_info['gameName']
             tagline = player_info['tagLine']
         else:
             tagline = "NA1" if "#" not in player_name else player_name.split("#")[1]
 
         region = "NA1"
-        summoner = cassiopeia.get_summoner(puuid=puuid, region="NA")
+        summoner, response = await asyncio.gather(
+            asyncio.to_thread(cassiopeia.get_summoner, puuid=puuid, region="NA"),
+            self.fetch_engine.request('GET',
+                                      f'https://op.gg/lol/summoners/na/{player_name}-{tagline}?queue_type=SOLORANKED',
+                                      self.low_priority))
+        op_gg_puuid = response.split('{\\"puuid\\":\\"')[-1].split('\\')[0]
+        return puuid, player_name, {'summoner_object': summoner, 'tagline': tagline, 'op_gg_puuid': op_gg_puuid,
+                                    'op_gg_updated_at': self.parse_op_gg_updated_at(response)}
+
+    def add_summoner_object(self, puuid: str, player_name: str, summoner_information: dict):
+        """
+        Add the information found by get_summoner_object to the player_information dictionary
+
+        :param puuid: Riot puuid of the player
+        :param player_name: Player name
+        :param summoner_information: Summoner object, tagline and op.gg puuid of the player
+        """
         if player_name not in self.player_information:
             self.player_information[player_name] = {'puuid': puuid}
-        self.player_information[player_name]['summoner_object'] = summoner
-        self.player_information[player_name]['tagline'] = tagline
-
-        response = requests.get(f'https://op.gg/lol/summoners/na/{player_name}-{tagline}?queue_type=SOLORANKED')
-        op_gg_puuid = response.text.split('{\\"puuid\\":\\"')[-1].split('\\')[0]
-        self.player_information[player_name]['op_gg_puuid'] = op_gg_puuid
+        self.player_information[player_name].update(summoner_information)
 
-    def get_summoner_id(self, player: str):
+    async def get_summoner_id(self, player: str):
         """
         Get the summoner id for the given player
 
         :param player: Player name
-        :return: Correct case name of the player
+        :return: Account information of the player
         """
         print(f"\tGetting summoner ID for: {player}")
         # player_name_url_encoded = urllib.parse.quote(player)
-        tag_line = "NA1" if "#" not in player else player.split("#")[1]
         try:
-            summoner_info = self.get_json(f'{self.base_url}/riot/account/v1/accounts/by-riot-id/{player}/'
-                                          f'{tag_line}{self.api_key}')
+            # The account is usually already known from identifying the scout in the scout queue
+            summoner_info = await self.player_resolver.get_account(player, self.low_priority)
         except HTTPError as e:
             self.errors['player_not_found'].append(player)
         else:
-            self.player_information[summoner_info['gameName']] = {'puuid': summoner_info['puuid']}
-            self.titles.append(summoner_info['gameName'])
-            return summoner_info['gameName']
+            return summoner_info
+
+    def add_summoner_id(self, summoner_info: dict) -> str:
+        """
+        Add the player found by get_summoner_id to the player_information dictionary
+
+        :param summoner_info: Account information of the player
+        :return: Correct case name of the player
+        """
+        self.player_information[summoner_info['gameName']] = {'puuid': summoner_info['puuid']}
+        self.titles.append(summoner_info['gameName'])
+        return summoner_info['gameName']
 
     @staticmethod
-    @lru_cache
-    def cached_post_request(url: str, data: str):
-        headers = {
-            'Next-Action': '409a2b9ca50d15e50a4dace93552e3a40113dc2753',
-        }
-        return requests.post(url, data=data, headers=headers)
+    def get_page_key(url: str, data: str) -> str:
+        """
+        Get the key a request is saved under in the page cache
+
+        :param url: Url of the request
+        :param data: Body of the request
+        :return: Key for the page cache
+        """
+        return f'{url}\n{data}'
+
+    def get_op_gg_history_request(self, player: str, queue: str, end_time: str) -> tuple:
+        """
+        Get the url and body to request a page of the player's op.gg match history
+
+        :param player: Player name
+        :param queue: Op.gg queue type. e.g. SOLORANKED
+        :param end_time: Creation time of the last game on the previous page, or an empty string for the newest page
+        :return: The url and body of the request
+        """
+        url = f'https://op.gg/lol/summoners/na/{player}-{self.player_information[player]["tagline"]}?queue_type={queue}'
+        data = f'[{{"locale":"en","region":"na","puuid":"{self.player_information[player]["op_gg_puuid"]}",' \
+               f'"gameType":"{queue}","endedAt":"{end_time}","champion":""}}]'
+        return url, data
+
+    async def cached_post_request(self, url: str, data: str, ttl: float) -> str:
+        """
+        Post to the given op.gg url, using the page cache when the same request has been made recently
+
+        :param url: Url to post to
+        :param data: Body of the request
+        :param ttl: Number of seconds a successful response may be reused for
+        :return: Text of the response
+        """
+        key = self.get_page_key(url, data)
+        response = self.page_cache.get(key)
+        if response is None:
+            headers = {
+                'Next-Action': '409a2b9ca50d15e50a4dace93552e3a40113dc2753',
+            }
+            response = await self.fetch_engine.request('POST', url, self.low_priority, data=data, headers=headers)
+            self.page_cache.set(key, response, ttl)
+        return response
 
-    def get_non_random_match_history(self, player: str):
+    async def get_non_random_match_history(self, player: str):
         """
-        Get the match history for the player in all non random game queues
+        Get the match history for the player in all non random game queues. Each game is tagged with its queue
 
         :param player: Player name
         """
         print(f"\tGetting all match history for: {player}")
         all_matches = []
-
-        for queue in ['SOLORANKED', 'FLEXRANKED', 'NORMAL', 'CLASH']:
-            end_time = ""
-            for cnt in range(5):
-                print(f'\t\t{queue} - {cnt + 1} of 5')
-                response = self.cached_post_request(f'https://op.gg/lol/summoners/na/{player}-{self.player_information[player]['tagline']}?queue_type={queue}',
-                                         data=f'[{{"locale":"en","region":"na","puuid":"{self.player_information[player]['op_gg_puuid']}","gameType":"{queue}","endedAt":"{end_time}","champion":""}}]')
-                try:
-                    response.raise_for_status()
-                except requests.exceptions.HTTPError as e:
-                    if response.status_code == 502:
-                        continue
-                data = json.loads(response.text.split('\n')[1][2:])
-                if len(data['data']) == 0 and end_time == "":
-                    end_time = (datetime.datetime.now() - datetime.timedelta(weeks=4)).strftime("%Y-%m-%dT00:23:00+09:00")
-                    continue
-                elif len(data['data']) == 0:
-                    try:
-                        end_time = (datetime.datetime.strptime(end_time, "%Y-%m-%dT%H:%M:%S+09:00") - datetime.timedelta(weeks=4)).strftime("%Y-%m-%dT00:23:00+09:00")
-                    except ValueError as e:
-                        print()
-                    continue
-                all_matches += data['data']
-                try:
-                    end_time = data['meta']['last_game_created_at']
-                except TypeError as e:
-                    print()
-                time.sleep(0.5)
+        queue_histories = await asyncio.gather(*[self.get_queue_match_history(player, queue)
+                                                 for queue in self.match_history_queues])
+        for queue, queue_matches in zip(self.match_history_queues, queue_histories):
+            all_matches += [dict(match, queue=queue) for match in queue_matches]
         # for queue_type in [cassiopeia.Queue.normal_draft_fives, cassiopeia.Queue.clash, cassiopeia.Queue.ranked_solo_fives, cassiopeia.Queue.ranked_flex_fives, cassiopeia.Queue.blind_fives]:
         #     all_matches += cassiopeia.get_match_history(puuid=self.player_information[player]["puuid"],
         #                                            start_time=self.match_start_epoch_time,
@@ -472,58 +639,82 @@ class APIQueries:
             self.titles.remove(player)
         self.player_information[player]['all_match_history'] = all_matches
 
+    async def get_queue_match_history(self, player: str, queue: str) -> list:
+        """
+        Page backwards through the op.gg match history of a single queue as planned by the pagination planner, then
+        merge the new games into the stored history. Each page needs the last game of the page before it, so the pages
+        of a queue are fetched one after another while the queues themselves are fetched at the same time
+
+        :param player: Player name
+        :param queue: Op.gg queue type. e.g. SOLORANKED
+        :return: Every match stored for the queue
+        """
+        op_gg_puuid = self.player_information[player]['op_gg_puuid']
+        if self.match_history_store.is_queue_empty(op_gg_puuid, queue, self.empty_queue_recheck_interval):
+            return []
+        planner = PaginationPlanner(self.match_window_start, self.max_games_per_queue, self.match_history_pages,
+                                    self.match_history_store.get_newest_created_at(op_gg_puuid, queue))
+        all_matches = []
+        start = time.perf_counter()
+        while planner.has_next_page():
+            data = await self.get_history_page(player, queue, planner.next_end_time())
+            if data is not None:
+                planner.plan_after_page(len(data['data']), (data.get('meta') or {}).get('last_game_created_at'))
+                all_matches += [self.trim_match(match) for match in data['data'] if planner.keep_game(match)]
+        self.metrics.observe('match_history_pagination_seconds', time.perf_counter() - start, {'queue': queue})
+        self.metrics.increment('match_history_pages_total', {'queue': queue}, planner.pages_requested)
+        return self.match_history_store.merge(op_gg_puuid, queue, all_matches, self.max_games_per_queue,
+                                              self.match_window_start)
+
+    async def get_history_page(self, player: str, queue: str, end_time: str):
+        """
+        Get a single page of the player's op.gg match history
+
+        :param player: Player name
+        :param queue: Op.gg queue type. e.g. SOLORANKED
+        :param end_time: Creation time of the last game on the previous page, or an empty string for the newest page
+        :return: The page's data and meta information, or None if op.gg failed to return the page
+        """
+        print(f'\t\t{player} {queue} - {end_time or "newest"}')
+        try:
+            response = await self.cached_post_request(
+                *self.get_op_gg_history_request(player, queue, end_time),
+                ttl=self.recent_page_ttl if end_time == "" else self.history_page_ttl)
+        except HTTPError as e:
+            if e.code == 502:
+                return None
+            raise e
+        return json.loads(response.split('\n')[1][2:])
+
+    @staticmethod
+    def trim_match(match: dict) -> dict:
+        """
+        Keep only the parts of an op.gg game used by the tables so the stored history stays small
+
+        :param match: Game from the op.gg match history
+        :return: Game with only the creation time, champion name and position
+        """
+        return {
+            'created_at': match['created_at'],
+            'champion': {'name': match['champion']['name']},
+            'position': match['position'],
+        }
+
     def get_player_ranked_clash_match_history(self, player: str):
         """
-        Get the match history for the given player
+        Get the ranked and clash games out of the full match history for the given player
 
         :param player: Player name
         """
         print(f"\tGetting important match history for: {player}")
-        all_matches = []
-        for queue in ['SOLORANKED', 'FLEXRANKED', 'CLASH']:
-            end_time = ""
-            for cnt in range(5):
-                print(f'\t\t{queue} - {cnt + 1} of 5')
-                response = self.cached_post_request(f'https://op.gg/lol/summoners/na/{player}-{self.player_information[player]['tagline']}?queue_type={queue}',
-                                         data=f'[{{"locale":"en","region":"na","puuid":"{self.player_information[player]['op_gg_puuid']}","gameType":"{queue}","endedAt":"{end_time}","champion":""}}]')
-                try:
-                    response.raise_for_status()
-                except HTTPError as e:
-                    if response.status_code == 502:
-                        continue
-                data = json.loads(response.text.split('\n')[1][2:])
-                if len(data['data']) == 0 and end_time == "":
-                    end_time = (datetime.datetime.now() - datetime.timedelta(weeks=4)).strftime("%Y-%m-%dT00:23:00+09:00")
-                    continue
-                elif len(data['data']) == 0:
-                    end_time = (datetime.datetime.strptime(end_time, "%Y-%m-%dT%H:%M:%S+09:00") - datetime.timedelta(weeks=4)).strftime("%Y-%m-%dT00:23:00+09:00")
-                    continue
-                all_matches += data['data']
-                try:
-                    end_time = data['meta']['last_game_created_at']
-                except TypeError as e:
-                    print()
-                # time.sleep(0.5)
-                # time.sleep(1)
-        # for queue_type in [cassiopeia.Queue.ranked_solo_fives, cassiopeia.Queue.ranked_flex_fives]:
-        #     all_matches += cassiopeia.get_match_history(puuid=self.player_information[player]["puuid"],
-        #                                            start_time=self.match_start_epoch_time,
-        #                                            queue=queue_type, count=20,
-        #                                            continent="AMERICAS")
-            # query_url = f'{self.base_url}/lol/match/v5/matches/by-puuid/' \
-            #             f'{self.player_information[player]["puuid"]}/ids{self.api_key}&count=100&type={queue_type}' \
-            #             f'&startTime={self.match_start_epoch_time}'
-                        # f'{self.queue_id["clash"]}{self.queue_id["ranked_solo"]}{self.queue_id["ranked_flex"]}'
-            # try:
-            #     all_matches += self.get_json(query_url)
-            # except HTTPError:
-            #     pass
+        all_matches = [match for match in self.player_information[player]['all_match_history']
+                       if match['queue'] in self.ranked_clash_queues]
         if len(all_matches) == 0:
             if player not in self.errors['no_match_history']:
                 self.errors['no_ranked_clash'].append(player)
         self.player_information[player]['ranked_match_history'] = all_matches
 
-    def get_player_champion_mastery(self, player: str):
+    async def get_player_champion_mastery(self, player: str):
         """
         Get all of the champion mastery information for the given player
 
@@ -533,7 +724,7 @@ class APIQueries:
         query_url = f'{self.base_url_na1}/lol/champion-mastery/v4/champion-masteries/by-puuid/' \
                     f'{self.player_information[player]["puuid"]}{self.api_key}'
         try:
-            self.parse_champion_mastery_information(player, self.get_json(query_url))
+            self.parse_champion_mastery_information(player, await self.get_json(query_url))
         except HTTPError:
             self.errors['no_champion_mastery'].append(player)
 
@@ -548,79 +739,35 @@ class APIQueries:
         self.check_all_champs_in_champion_info(mastery_information)
         self.player_information[player]['mastery_information'] = {}
         for champion in mastery_information:
-            for champ_id in self.champion_info.values():
-                if int(champ_id['key']) == champion['championId']:
-                    self.player_information[player]['mastery_information'][champ_id['id']] = \
-                        {'mastery': champion['championPoints'], 'last_play_time': champion['lastPlayTime']}
-                    break
+            champion_id = self.champion_registry.get_id_by_key(champion['championId'])
+            if champion_id is not None:
+                self.player_information[player]['mastery_information'][champion_id] = \
+                    {'mastery': champion['championPoints'], 'last_play_time': champion['lastPlayTime']}
 
     def check_all_champs_in_champion_info(self, mastery_information: dict):
         """
-        Verify all of the champions in the champion mastery information are in the champion info dictionary. If there
-        is a missing champion then re-download the latest champion info
+        Verify all of the champions in the champion mastery information are in the champion registry. If there is a
+        missing champion then check for a new patch in the background, the champion is skipped for this query
 
         :param mastery_information: Dictionary of champion mastery information
         """
-        champion_info_keys = [int(self.champion_info[champ]['key']) for champ in self.champion_info]
-        mastery_info_keys = [champ['championId'] for champ in mastery_information]
-        for key in mastery_info_keys:
-            if key not in champion_info_keys:
-                self.download_champion_info()
-
-    def get_all_champion_info(self):
-        """
-        Get all of the latest champion info from the data dragon or saved file
-        """
-        self.create_folder_if_it_does_not_exists('../extra_files')
-
-        # If there is already a saved file
-        if os.path.isfile('../extra_files/champion_info.json'):
-            with open('../extra_files/champion_info.json') as champion_info_file:
-                self.champion_info = json.load(champion_info_file)
-
-            if self.champion_info['Aatrox']['version'] != self.get_json('http://ddragon.leagueoflegends.com/api/versions.json')[0]:
-                self.download_champion_info()
-
-        # If a new download is needed
-        else:
-            self.download_champion_info()
-
-    def download_champion_info(self):
-        """
-        Download the latest champion info from the data dragon and save it
-        """
-        print("Downloading latest champion info...")
-        version = self.get_json('http://ddragon.leagueoflegends.com/api/versions.json')[0]
-        self.champion_info = self.get_json(f'http://ddragon.leagueoflegends.com/cdn/'
-                                           f'{version}/data/en_US/champion.json')['data']
-        with open('../extra_files/champion_info.json', 'w') as champion_info_file:
-            json.dump(self.champion_info, champion_info_file)
+        if any(champion['championId'] not in self.champion_registry for champion in mastery_information):
+            get_static_data().request_refresh()
 
-    @staticmethod
-    def create_folder_if_it_does_not_exists(path: str):
+    async def get_all_champion_info(self):
         """
-        Create the folder in the given path if it does not exist
-
-        :param path: Path to create the folder in
+        Get the current champion info from the static data service
         """
-        if not os.path.isdir(path):
-            os.mkdir(path)
+        self.champion_registry = await get_static_data().get_champion_registry()
+        self.champion_info = self.champion_registry.champion_info
 
-    def get_json(self, url: str) -> dict:
+    async def get_json(self, url: str) -> dict:
         """
         Query the given url to get it's json response
 
         :return: Json object of the url request
         """
-        response = requests.get(url)
-        try:
-            response.raise_for_status()
-        except HTTPError as e:
-            if response.status_code == 429:
-                time.sleep(2)
-                return self.get_json(url)
-            raise e
-        return response.json()
+        return await self.fetch_engine.get_json(url, self.low_priority)
 
 
 if __name__ == '__main__':
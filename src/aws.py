@@ -1,6 +1,10 @@
+import io
 import os
 import boto3
-from botocore.exceptions import NoCredentialsError
+
+from metrics import get_metrics
+from process_shared import shared_instance
+from botocore.exceptions import ClientError, NoCredentialsError
 
 
 class AWSHandler:
@@ -9,21 +13,54 @@ class AWSHandler:
     """
 
     def __init__(self):
-        self.auth = boto3.client('s3', aws_access_key_id=os.environ['AWSAccessKeyId'], aws_secret_access_key=os.environ['AWSSecretKey'])
+        self.auth = get_s3_client()
+        self.bucket = 'clashbotimages2025'
 
-    def upload_image(self, filename: str):
+    def upload_image(self, filename: str, image: bytes):
         """
-        Upload the current game image to AWS
+        Upload the image of a table to AWS straight from memory
 
-        :param filename: Name of the file to load and save as on AWS. e.g. user_info.jpg
+        :param filename: Name to save the image as on AWS. e.g. 1234_player_ranks.png
+        :param image: Encoded PNG of the image
         """
-        filename = filename.split('/')[-1]
         try:
-            self.auth.upload_file(f'../extra_files/{filename}', 'clashbotimages2025', filename,
-                                  ExtraArgs={'ContentType': 'image/png',})
-        except FileNotFoundError as e:
-            print()
-            pass
+            with get_metrics().timer('s3_upload_seconds'):
+                self.auth.upload_fileobj(io.BytesIO(image), self.bucket, filename,
+                                         ExtraArgs={'ContentType': 'image/png',})
         except NoCredentialsError as e:
             print()
             pass
+
+    def expire_images(self, prefix: str, days: int):
+        """
+        Add a lifecycle rule to the bucket so the images under the prefix are deleted by AWS after the given number of
+        days. Any other rules on the bucket are kept
+
+        :param prefix: Start of the name of every image to expire. e.g. tables/
+        :param days: Number of days an image is kept for
+        """
+        rule = {'ID': f'expire-{prefix.strip("/")}', 'Filter': {'Prefix': prefix}, 'Status': 'Enabled',
+                'Expiration': {'Days': days}}
+        try:
+            try:
+                rules = self.auth.get_bucket_lifecycle_configuration(Bucket=self.bucket)['Rules']
+            except ClientError as e:
+                if e.response['Error']['Code'] != 'NoSuchLifecycleConfiguration':
+                    raise
+                rules = []
+            rules = [existing_rule for existing_rule in rules if existing_rule.get('ID') != rule['ID']] + [rule]
+            self.auth.put_bucket_lifecycle_configuration(Bucket=self.bucket, LifecycleConfiguration={'Rules': rules})
+        except (ClientError, NoCredentialsError) as e:
+            print(f'Failed to set the expiry of the images: {e}')
+
+
+@shared_instance
+def get_s3_client() -> object:
+    """
+    Get the S3 client shared by the process. Creating a client is slow, and a client can be used from several threads
+    at once, unlike the default boto3 session, so it is created once on its own session
+
+    :return: Shared S3 client
+    """
+    return boto3.session.Session().client('s3', aws_access_key_id=os.environ['AWSAccessKeyId'],
+                                          aws_secret_access_key=os.environ['AWSSecretKey'])
@@ -13,15 +13,17 @@ class CalculateBanRecommendations:
     Calculate object for getting the total points of each champion
     """
 
-    def __init__(self, combined_tables: list, locked_in_role: bool = False):
+    def __init__(self, combined_tables: list, locked_in_role: bool = False, file_prefix: str = ''):
         """
         Calculate object for getting the total points of each champion
 
         :param combined_tables: Array of each table for the other queries along with their colour codes
         :param locked_in_role: If the locked in role was known and had the table created
+        :param file_prefix: Prefix to add to the image file name
         """
         self.combined_tables = combined_tables
         self.locked_in_role = locked_in_role
+        self.file_prefix = file_prefix
         self.titles = ['Champion', 'Points']
         self.current_table = None
         self.current_colours = None
@@ -51,7 +53,7 @@ class CalculateBanRecommendations:
         """
         Create image from the processed results
         """
-        CreateImage(self.titles, self.columns, '../extra_files/ban_recommendations.png',
+        CreateImage(self.titles, self.columns, f'{self.file_prefix}ban_recommendations.png',
                     colour=self.colour_columns, convert_columns=True)
 
     def process_top_ten_champs(self):
@@ -0,0 +1,67 @@
+"""
+This file indexes the champion info from the data dragon so champions can be looked up without scanning every champion
+"""
+
+import re
+from types import MappingProxyType
+
+
+class ChampionRegistry:
+    """
+    Immutable index of the champion info by numeric key, data dragon id and display name. Names are indexed by both
+    the id and the display name once normalised, which covers the spellings used by op.gg. e.g. Wukong and MonkeyKing,
+    Nunu & Willump and Nunu
+    """
+    def __init__(self, champion_info: dict):
+        """
+        Immutable index of the champion info by numeric key, data dragon id and display name
+
+        :param champion_info: Champion data from the data dragon champion.json keyed by champion id
+        """
+        by_key = {}
+        by_name = {}
+        for champion_id, champion in champion_info.items():
+            by_key[int(champion['key'])] = champion_id
+            by_name[self.normalise_name(champion_id)] = champion_id
+            by_name[self.normalise_name(champion['name'])] = champion_id
+
+        self.champion_info = MappingProxyType(dict(champion_info))
+        self.by_key = MappingProxyType(by_key)
+        self.by_name = MappingProxyType(by_name)
+        self.version = next(iter(champion_info.values()), {}).get('version')
+
+    @staticmethod
+    def normalise_name(name: str) -> str:
+        """
+        Normalise a champion name so the different spellings match. e.g. Kai'Sa, Kaisa and KaiSa all become kaisa
+
+        :param name: Champion name or id
+        :return: Lower case name with only letters and numbers
+        """
+        return re.sub(r'[^a-z0-9]', '', str(name).lower())
+
+    def __contains__(self, key: int) -> bool:
+        """
+        Check if the registry knows the champion with the given numeric key
+
+        :param key: Numeric champion key. e.g. 266
+        """
+        return key in self.by_key
+
+    def get_id_by_key(self, key: int):
+        """
+        Get the data dragon id of the champion with the given numeric key
+
+        :param key: Numeric champion key. e.g. 266
+        :return: Champion id. e.g. Aatrox, or None if the champion is unknown
+        """
+        return self.by_key.get(int(key))
+
+    def get_id_by_name(self, name: str):
+        """
+        Get the data dragon id of the champion with the given display name, id or op.gg name
+
+        :param name: Any spelling of the champion name. e.g. Wukong, MonkeyKing, Dr. Mundo
+        :return: Champion id. e.g. MonkeyKing, or None if the champion is unknown
+        """
+        return self.by_name.get(self.normalise_name(name))
@@ -10,14 +10,16 @@ class ChampionsForRole:
     """
     Handle creating the champions for role table
     """
-    def __init__(self, api_results: object, title_colours: list):
+    def __init__(self, api_results: object, title_colours: list, file_prefix: str = ''):
         """
         Handle creating the champions for role table
 
         :param api_results: Results from the api_queries file
         :param title_colours: What to colour each title based ont eh player's rank
+        :param file_prefix: Prefix to add to the image file name
         """
         self.api_results = api_results
+        self.file_prefix = file_prefix
         self.title_colours = title_colours[:]
         self.titles = None
         self.columns = []
@@ -27,7 +29,7 @@ class ChampionsForRole:
         self.colour_current_column = []
         self.champions_played = None
         self.current_match = None
-        self.champion_info = self.api_results.champion_info
+        self.champion_registry = self.api_results.champion_registry
         self.champions_played = {}
         self.champion = None
         self.player_cnt = None
@@ -48,7 +50,7 @@ class ChampionsForRole:
         """
         Create the image from the processed results
         """
-        CreateImage(self.titles, self.columns, '../extra_files/champions_for_role.png',
+        CreateImage(self.titles, self.columns, f'{self.file_prefix}champions_for_role.png',
                     colour=self.colour_columns, convert_columns=True, title_colours=self.title_colours)
 
     def create_recent_champion_table(self):
@@ -2,6 +2,7 @@
 This file handles all of the interactions with discord and controls creating each table to display
 """
 import asyncio
+import functools
 import os
 import urllib
 import time
@@ -11,7 +12,7 @@ import discord
 import discord.gateway
 
 import api_queries
-import json
+import aws
 import shelve
 import datetime
 
@@ -26,12 +27,24 @@ from recent_champion import RecentChampion
 from player_ranks import PlayerRanks
 from player_locked_in_position import PlayerLockedInPosition
 from champions_for_role import ChampionsForRole
-from threading import Lock
+from message_history_store import get_message_history_store
+from metrics import get_metrics
+from prewarm_scheduler import get_prewarm_scheduler
+from scout_context import ScoutContext
+from scout_queue import ScoutQueue
+from scout_result_cache import get_scout_result_cache
+from static_data import get_static_data
+from concurrent.futures import ThreadPoolExecutor
+
+
+# Created once so restarting the bot after an error reuses the same worker threads
+scout_executor = ThreadPoolExecutor(max_workers=int(os.getenv('SCOUT_WORKERS', 4)), thread_name_prefix='scout')
 
 
 class TableHandler:
     """
-    Class to handle the creation and management of all of the tables
+    Class to handle the creation and management of all of the tables. Everything belonging to a single command is
+    kept in the ScoutContext passed to each method so several commands can run at the same time
     """
 
     def __init__(self, discord_bot: object):
@@ -40,43 +53,67 @@ class TableHandler:
         """
         self.discord_bot = discord_bot
         self.severity = ['Red', 'Orange', 'Yellow', 'Blue', 'Green']
-        self.roll_rate = None
-        self.mastery_shared = None
-        self.recent_champion = None
-        self.clash_ranked = None
-        self.player_ranks = None
-        self.champions_for_role = None
-        self.api_info = None
-        self.player_list = []
+        self.error_headings = {
+            'player_not_found': 'The given player(s) were not found:',
+            'no_match_history': 'The given player(s) have no match history:',
+            'no_ranked_info': 'The given player(s) are not placed in any rank queue:',
+            'no_ranked_clash': 'The given player(s) have never played ranked or clash:',
+            'no_clash_team': 'The given player(s) are not in a clash team:'
+        }
+
+        # Fetching, calculating and drawing the tables blocks, so it runs on worker threads to keep the event loop free
+        # for the gateway heartbeats and every other command
+        self.executor = scout_executor
+        self.metrics = get_metrics()
 
         self.debug = False
 
-    async def get_role_rate_table(self):
+    async def run_in_worker(self, function, *args, **kwargs):
+        """
+        Run a blocking function on a worker thread and wait for the result without blocking the event loop
+
+        :param function: Blocking function to run. e.g. a table constructor
+        :return: The value returned by the function
+        """
+        loop = asyncio.get_running_loop()
+        with self.metrics.timer('worker_task_seconds', {'task': function.__name__}):
+            return await loop.run_in_executor(self.executor, functools.partial(function, *args, **kwargs))
+
+    async def get_role_rate_table(self, context: ScoutContext):
         """
         Parse the player list to generate the role rate table
+
+        :param context: State of the command being processed
         """
         fields = {
             self.severity[0]: '>50% play rate',
             self.severity[1]: '>25% play rate'
         }
-        self.roll_rate = RoleRate(self.api_info, self.player_ranks.colour_columns[0])
-        await self.discord_bot.post_to_discord(title='Lane Play Rate', filename='roll_rate.png', fields=fields)
+        context.roll_rate = await self.run_in_worker(RoleRate, context.api_info, context.player_ranks.colour_columns[0],
+                                                     file_prefix=context.file_prefix)
+        await self.discord_bot.post_to_discord(context, title='Lane Play Rate', filename='roll_rate.png', fields=fields)
 
-    async def get_mastery_shared_table(self):
+    async def get_mastery_shared_table(self, context: ScoutContext):
         """
         Parse the player list to generate the mastery shared table
+
+        :param context: State of the command being processed
         """
         fields = {
             self.severity[0]: 'High mastery points and shared champ',
             self.severity[1]: 'High mastery points',
             self.severity[2]: 'Shared champ'
         }
-        self.mastery_shared = MasteryShared(self.api_info, self.player_ranks.colour_columns[0])
-        await self.discord_bot.post_to_discord(title='Mastery/Shared Champions', filename='mastery_shared.png', fields=fields)
+        context.mastery_shared = await self.run_in_worker(MasteryShared, context.api_info,
+                                                          context.player_ranks.colour_columns[0],
+                                                          file_prefix=context.file_prefix)
+        await self.discord_bot.post_to_discord(context, title='Mastery/Shared Champions', filename='mastery_shared.png', fields=fields)
 
-    async def get_recent_champion_table(self):
+    async def get_recent_champion_table(self, context: ScoutContext):
         """
         Parse the player list to generate the recent champion table
+
+        :param context: State of the command being processed
         """
         fields = {
             self.severity[0]: '+25 games and shared champ',
@@ -86,12 +123,16 @@ class TableHandler:
             self.severity[4]: 'Shared champ',
             'NOTE': 'Does not include ARAM or Poro King games'
         }
-        self.recent_champion = RecentChampion(self.api_info, 'all_match_history', self.player_ranks.colour_columns[0])
-        await self.discord_bot.post_to_discord(title='Recently Played Champions', filename='all_match_history.png', fields=fields)
+        context.recent_champion = await self.run_in_worker(RecentChampion, context.api_info, 'all_match_history',
+                                                           context.player_ranks.colour_columns[0],
+                                                           file_prefix=context.file_prefix)
+        await self.discord_bot.post_to_discord(context, title='Recently Played Champions', filename='all_match_history.png', fields=fields)
 
-    async def get_clash_ranked_table(self):
+    async def get_clash_ranked_table(self, context: ScoutContext):
         """
         Parse the player list to generate the clash ranked table
+
+        :param context: State of the command being processed
         """
         fields = {
             self.severity[0]: '+25 games and shared champ',
@@ -100,26 +141,34 @@ class TableHandler:
             self.severity[3]: '+10 games',
             self.severity[4]: 'Shared champ'
         }
-        self.clash_ranked = RecentChampion(self.api_info, 'ranked_match_history', self.player_ranks.colour_columns[0])
-        await self.discord_bot.post_to_discord(title='Clash/Ranked Champions', filename='ranked_match_history.png', fields=fields)
+        context.clash_ranked = await self.run_in_worker(RecentChampion, context.api_info, 'ranked_match_history',
+                                                        context.player_ranks.colour_columns[0],
+                                                        file_prefix=context.file_prefix)
+        await self.discord_bot.post_to_discord(context, title='Clash/Ranked Champions', filename='ranked_match_history.png', fields=fields)
 
-    async def get_player_ranks_table(self):
+    async def get_player_ranks_table(self, context: ScoutContext):
         """
         Parse the player list to get the player ranks table
+
+        :param context: State of the command being processed
         """
-        self.player_ranks = PlayerRanks(self.api_info)
-        await self.discord_bot.post_to_discord(title='Player Ranks', filename='player_ranks.png', fields={})
+        context.player_ranks = await self.run_in_worker(PlayerRanks, context.api_info, file_prefix=context.file_prefix)
+        await self.discord_bot.post_to_discord(context, title='Player Ranks', filename='player_ranks.png', fields={})
 
-    async def get_player_locked_in_position(self):
+    async def get_player_locked_in_position(self, context: ScoutContext):
         """
         Parse the player list to get the lock in position table
+
+        :param context: State of the command being processed
         """
-        PlayerLockedInPosition(self.api_info)
-        await self.discord_bot.post_to_discord(title='Player Positions', filename='player_positions.png', fields={})
+        await self.run_in_worker(PlayerLockedInPosition, context.api_info, file_prefix=context.file_prefix)
+        await self.discord_bot.post_to_discord(context, title='Player Positions', filename='player_positions.png', fields={})
 
-    async def get_champions_for_locked_in_role(self):
+    async def get_champions_for_locked_in_role(self, context: ScoutContext):
         """
         Get the table to display played champions in the locked in role
+
+        :param context: State of the command being processed
         """
         fields = {
             self.severity[0]: '+25% total games and shared champ',
@@ -128,13 +177,16 @@ class TableHandler:
             self.severity[3]: '+16% total games',
             self.severity[4]: 'Shared champ',
         }
-        self.champions_for_role = ChampionsForRole(self.api_info, self.player_ranks.colour_columns[0])
-        await self.discord_bot.post_to_discord(title='Champions Per Role', filename='champions_for_role.png', fields=fields)
+        context.champions_for_role = await self.run_in_worker(ChampionsForRole, context.api_info,
+                                                              context.player_ranks.colour_columns[0],
+                                                              file_prefix=context.file_prefix)
+        await self.discord_bot.post_to_discord(context, title='Champions Per Role', filename='champions_for_role.png', fields=fields)
 
-    async def get_ban_recommendation_table(self, know_position: bool = False):
+    async def get_ban_recommendation_table(self, context: ScoutContext, know_position: bool = False):
         """
         Parse the player list to generate the ban recommendation table
 
+        :param context: State of the command being processed
         :param know_position: If the positions of the players are known use the champions_for_role table
         """
         fields = {
@@ -142,110 +194,110 @@ class TableHandler:
             self.severity[1]: '+7% of top 15 score',
             self.severity[2]: '+5% of top 15 score'
         }
-        combined_tables = [[self.mastery_shared.columns, self.mastery_shared.colour_columns],
-                           [self.recent_champion.columns, self.recent_champion.colour_columns],
-                           [self.clash_ranked.columns, self.clash_ranked.colour_columns]]
+        combined_tables = [[context.mastery_shared.columns, context.mastery_shared.colour_columns],
+                           [context.recent_champion.columns, context.recent_champion.colour_columns],
+                           [context.clash_ranked.columns, context.clash_ranked.colour_columns]]
         if know_position:
-            combined_tables.append([self.champions_for_role.columns, self.champions_for_role.colour_columns])
-            CalculateBanRecommendations(combined_tables, locked_in_role=True)
+            combined_tables.append([context.champions_for_role.columns, context.champions_for_role.colour_columns])
+            await self.run_in_worker(CalculateBanRecommendations, combined_tables, locked_in_role=True,
+                                     file_prefix=context.file_prefix)
         else:
-            CalculateBanRecommendations(combined_tables, locked_in_role=False)
-        await self.discord_bot.post_to_discord(title='Ban List', filename='ban_recommendations.png', fields=fields)
+            await self.run_in_worker(CalculateBanRecommendations, combined_tables, locked_in_role=False,
+                                     file_prefix=context.file_prefix)
+        await self.discord_bot.post_to_discord(context, title='Ban List', filename='ban_recommendations.png', fields=fields)
 
-    async def get_all_tables(self, display_positions: bool = False):
+    async def get_all_tables(self, context: ScoutContext, display_positions: bool = False):
         """
         Get all of the different types of tables for each player given
 
+        :param context: State of the command being processed
         :param display_positions: Display the locked in positions table if using the clash API
         """
-        if len(self.api_info.errors['no_clash_team']) == 0:
-            await self.get_player_ranks_table()
-            if display_positions:
-                await self.get_player_locked_in_position()
-            await self.get_role_rate_table()
-            await self.get_mastery_shared_table()
-            await self.get_recent_champion_table()
-            await self.get_clash_ranked_table()
+        if len(context.api_info.errors['no_clash_team']) == 0:
+
+            # Each table lists the tables it needs before it can be created. The rest are created at the same time and
+            # posted as soon as they are ready
+            ban_dependencies = ['mastery_shared', 'recent_champion', 'clash_ranked']
+            table_graph = {
+                'player_ranks': ([], self.get_player_ranks_table),
+                'role_rate': (['player_ranks'], self.get_role_rate_table),
+                'mastery_shared': (['player_ranks'], self.get_mastery_shared_table),
+                'recent_champion': (['player_ranks'], self.get_recent_champion_table),
+                'clash_ranked': (['player_ranks'], self.get_clash_ranked_table),
+            }
             if display_positions:
-                await self.get_champions_for_locked_in_role()
-                await self.get_ban_recommendation_table(know_position=True)
-            else:
-                await self.get_ban_recommendation_table()
-        await self.post_error_messages()
+                table_graph['player_positions'] = ([], self.get_player_locked_in_position)
+                # The role rate table fills in the champions each player plays in every position
+                table_graph['champions_for_role'] = (['player_ranks', 'role_rate'],
+                                                     self.get_champions_for_locked_in_role)
+                ban_dependencies.append('champions_for_role')
+            table_graph['ban_recommendations'] = (ban_dependencies, functools.partial(
+                self.get_ban_recommendation_table, know_position=display_positions))
+            try:
+                await self.run_table_graph(context, table_graph)
+            finally:
+                # Tables finished before another one failed are still posted
+                await self.discord_bot.post_pending_tables(context)
+        await self.post_error_messages(context)
 
-    async def post_error_messages(self):
+    @staticmethod
+    async def run_table_graph(context: ScoutContext, table_graph: dict):
         """
-        Post any error messages generated while using the api queries
-        """
-        await self.post_player_not_found()
-        await self.post_no_match_history()
-        await self.post_no_ranked_info()
-        await self.post_no_ranked_clash()
-        await self.post_no_clash_team()
+        Create every table in the graph, starting each one as soon as the tables it depends on are finished
 
-    async def post_player_not_found(self):
-        """
-        Post if a given player was not found
+        :param context: State of the command being processed
+        :param table_graph: Name of each table mapped to the names of the tables it depends on and the function to
+                            create and post it
         """
-        failure_message = 'The given player(s) were not found:\n'
-        for player_name in self.api_info.errors['player_not_found']:
-            failure_message += f'\t-\t{player_name}\n'
-        if failure_message != 'The given player(s) were not found:\n':
-            self.discord_bot.message_list.append(await self.discord_bot.message.channel.send(failure_message))
+        tasks = {}
 
-    async def post_no_ranked_info(self):
-        """
-        Post if a given player has no rank
-        """
-        failure_message = 'The given player(s) are not placed in any rank queue:\n'
-        for player_name in self.api_info.errors['no_ranked_info']:
-            failure_message += f'\t-\t{player_name}\n'
-        if failure_message != 'The given player(s) are not placed in any rank queue:\n':
-            self.discord_bot.message_list.append(await self.discord_bot.message.channel.send(failure_message))
+        async def create_table(name: str):
+            dependencies, create = table_graph[name]
+            await asyncio.gather(*[tasks[dependency] for dependency in dependencies])
+            await create(context)
 
-    async def post_no_ranked_clash(self):
-        """
-        Post if a given player has never played ranked or clash
-        """
-        failure_message = 'The given player(s) have never played ranked or clash:\n'
-        for player_name in self.api_info.errors['no_ranked_clash']:
-            failure_message += f'\t-\t{player_name}\n'
-        if failure_message != 'The given player(s) have never played ranked or clash:\n':
-            self.discord_bot.message_list.append(await self.discord_bot.message.channel.send(failure_message))
+        # Every task is created before any of them start so each one can wait on the tasks it depends on
+        for table_name in table_graph:
+            tasks[table_name] = asyncio.ensure_future(create_table(table_name))
+        try:
+            await asyncio.gather(*tasks.values())
+        except Exception:
+            for task in tasks.values():
+                task.cancel()
+            await asyncio.gather(*tasks.values(), return_exceptions=True)
+            raise
 
-    async def post_no_match_history(self):
-        """
-        Post if a given player was not found
+    async def post_error_messages(self, context: ScoutContext):
         """
-        failure_message = 'The given player(s) have no match history:\n'
-        for player_name in self.api_info.errors['no_match_history']:
-            failure_message += f'\t-\t{player_name}\n'
-        if failure_message != 'The given player(s) have no match history:\n':
-            self.discord_bot.message_list.append(await self.discord_bot.message.channel.send(failure_message))
+        Post every error generated while using the api queries together in a single message
 
-    async def post_no_clash_team(self):
+        :param context: State of the command being processed
         """
-        Post if a given player was not in a clash team
-        """
-        failure_message = 'The given player(s) are not in a clash team:\n'
-        for player_name in self.api_info.errors['no_clash_team']:
-            failure_message += f'\t-\t{player_name}\n'
-        if failure_message != 'The given player(s) are not in a clash team:\n':
-            self.discord_bot.message_list.append(await self.discord_bot.message.channel.send(failure_message))
+        failure_messages = []
+        for error, heading in self.error_headings.items():
+            if len(context.api_info.errors[error]) > 0:
+                player_names = ''.join(f'\t-\t{player_name}\n' for player_name in context.api_info.errors[error])
+                failure_messages.append(f'{heading}\n{player_names}')
+        if len(failure_messages) > 0:
+            await self.discord_bot.send(context, '\n'.join(failure_messages))
 
-    async def get_api_information_for_each_player(self, clash_api: bool = False):
+    async def get_api_information_for_each_player(self, context: ScoutContext, clash_api: bool = False,
+                                                  query_clash_members: bool = True):
         """
         Run the API queries for each player
 
+        :param context: State of the command being processed
         :param clash_api: If using a single player to leverage the clash API
+        :param query_clash_members: Query every member of the clash team, or only find the team
         """
         if not self.debug:
-            api_info = api_queries.APIQueries(self.player_list, clash_api)
-            self.api_info = api_info
+            api_info = await self.run_in_worker(api_queries.APIQueries, context.player_list, clash_api,
+                                                query_clash_members=query_clash_members)
+            context.api_info = api_info
         else:
             try:
                 with shelve.open('/home/ubuntu/ClashBot/extra_files/my_api') as shelf:
-                    self.api_info = dict(shelf)['0']
+                    context.api_info = dict(shelf)['0']
             except Exception:
                 import dbm
                 print()
@@ -260,34 +312,38 @@ class TableHandler:
         #     save_number = '0'
         #
         # with shelve.open(shelf_path) as shelf:
-        #     shelf[save_number] = self.api_info
+        #     shelf[save_number] = context.api_info
 
-    async def get_names_from_discord_message(self):
+    async def get_names_from_discord_message(self, context: ScoutContext):
         """
         Parse the discord message to grab each summoner name given
+
+        :param context: State of the command being processed
         """
-        self.player_list = [param['value'] for param in self.discord_bot.message.data['options']]
+        context.player_list = [param['value'] for param in context.message.data['options']]
 
         # Use the default list of players if none were given
-        if self.player_list == ['test']:
-            self.player_list = ['iKony',
-                                'Eric1',
-                                'Shorthop',
-                                'spiderjo',
-                                'Debonairesnake6']
+        if context.player_list == ['test']:
+            context.player_list = ['iKony',
+                                   'Eric1',
+                                   'Shorthop',
+                                   'spiderjo',
+                                   'Debonairesnake6']
 
         # Notify the user tables are being created
-        player_message = '\n-\t'.join(self.player_list)
-        self.discord_bot.message_list.append(
-            await self.discord_bot.message.channel.send(f'Attempting to create tables for:\n\t-\t{player_message}'))
+        player_message = '\n-\t'.join(context.player_list)
+        context.message_list.append(
+            await context.channel.send(f'Attempting to create tables for:\n\t-\t{player_message}'))
 
-    async def parse_discord_message_single_player(self):
+    async def parse_discord_message_single_player(self, context: ScoutContext):
         """
         Parse the discord message to extract the single player name given
+
+        :param context: State of the command being processed
         """
-        self.player_list = [self.discord_bot.message.data['options'][0]['value']]  # todo get the acutal clash team with the new api call
-        self.discord_bot.message_list.append(
-            await self.discord_bot.message.channel.send(f'Attempting to create tables for {self.player_list[0]}\'s clash team.'))
+        context.player_list = [context.message.data['options'][0]['value']]  # todo get the acutal clash team with the new api call
+        context.message_list.append(
+            await context.channel.send(f'Attempting to create tables for {context.player_list[0]}\'s clash team.'))
 
 
 class DiscordBot:
@@ -301,97 +357,207 @@ class DiscordBot:
         self.bot.setup_hook = self.setup_hook
         self.bot.tree.clear_commands(guild=None)
         self.table_handler = TableHandler(self)
-        self.message = None
-        self.reaction_payload = None
-        self.message_history = {}
-        self.message_list = []
-        self.embed = Embed()
+        self.scout_queue = ScoutQueue(self)
+        self.scout_result_cache = get_scout_result_cache()
+        self.prewarm_scheduler = get_prewarm_scheduler()
+        self.metrics = get_metrics()
+        self.message_history = get_message_history_store()
         self.image_url = 'https://clashbotimages2025.s3.us-east-2.amazonaws.com/'
-        self.lock = Lock()
+
+        # Progressive delivery posts each table in its own message as soon as it is ready. Batched delivery posts every
+        # table of a scout together, up to ten embeds per message, in fewer messages but only once the slowest table is
+        # finished
+        self.batch_tables = os.getenv('DISCORD_DELIVERY', 'progressive') == 'batched'
+        self.max_embeds_per_message = 10
+
+        # The tables are created at the same time and finish in any order, so batched tables are posted in this order
+        self.table_order = ['player_ranks.png', 'player_positions.png', 'roll_rate.png', 'mastery_shared.png',
+                            'all_match_history.png', 'ranked_match_history.png', 'champions_for_role.png',
+                            'ban_recommendations.png']
 
     async def setup_hook(self) -> None:
         print("Syncing commands...")
         await self.bot.tree.sync()
 
-    async def post_to_discord(self, title: str, filename: str, fields: dict):
+    async def post_to_discord(self, context: ScoutContext, title: str, filename: str, fields: dict):
         """
         Post the gathered information to discord
 
+        :param context: State of the command being processed
         :param title: The name of the table
         :param filename: Name of the file to upload
         :param fields: Each field to add to the embed for a description
         """
-        with self.lock:
-            timestamp = int(datetime.datetime.now().timestamp())
-            self.embed.clear_fields()
-            self.embed.set_image(url=f'{self.image_url}{filename}?{timestamp}')
-            self.embed.title = title
-            for key, value in fields.items():
-                self.embed.add_field(name=key, value=value, inline=False)
-            self.message_list.append(await self.message.channel.send(embed=self.embed))
+        timestamp = int(datetime.datetime.now().timestamp())
+        embed = Embed(title=title)
+        embed.set_image(url=f'{self.image_url}{context.file_prefix}{filename}?{timestamp}')
+        for key, value in fields.items():
+            embed.add_field(name=key, value=value, inline=False)
+        if self.batch_tables:
+            context.pending_embeds[filename] = embed
+        else:
+            await self.send(context, embeds=[embed])
+
+    async def post_pending_tables(self, context: ScoutContext):
+        """
+        Post the tables held back by batched delivery in as few messages as possible
+
+        :param context: State of the command being processed
+        """
+        def get_position(filename: str) -> int:
+            return self.table_order.index(filename) if filename in self.table_order else len(self.table_order)
+
+        embeds = [context.pending_embeds[filename] for filename in sorted(context.pending_embeds, key=get_position)]
+        for start in range(0, len(embeds), self.max_embeds_per_message):
+            await self.send(context, embeds=embeds[start:start + self.max_embeds_per_message])
+        context.pending_embeds = {}
+
+    async def send(self, context: ScoutContext, content: str = None, embeds: list = None, share: bool = True):
+        """
+        Send a message to the channel of the command and of every identical command sharing its results
+
+        :param context: State of the command being processed
+        :param content: Text of the message
+        :param embeds: Embeds to attach to the message
+        :param share: Send the message to the identical commands as well. Messages only meant for the command itself,
+                      such as its place in the queue, are neither shared nor replayed to commands joining later
+        """
+        targets = [context]
+        if share:
+            context.posts.append({'content': content, 'embeds': embeds})
+            targets += context.followers
+        for target in targets:
+            with self.metrics.timer('discord_post_seconds'):
+                target.message_list.append(await target.channel.send(content=content, embeds=embeds))
+
+    @staticmethod
+    async def add_follower(leader: ScoutContext, follower: ScoutContext):
+        """
+        Share the results of a scout with an identical command. Everything already posted is sent to the new command
+        before it receives the rest of the posts along with the original command
+
+        :param leader: State of the command running the scout
+        :param follower: State of the identical command
+        """
+        posted = 0
+        while posted < len(leader.posts):
+            post = leader.posts[posted]
+            follower.message_list.append(await follower.channel.send(content=post['content'], embeds=post['embeds']))
+            posted += 1
+        leader.followers.append(follower)
 
-    async def process_discord_message(self):
+    async def process_discord_message(self, message: object) -> ScoutContext:
         """
         Process the given discord message and run the appropriate functions
+
+        :param message: Discord message or interaction that started the command
+        :return: State of the processed command
         """
-        self.message_list = []
-        await self.table_handler.get_names_from_discord_message()
-        await self.table_handler.get_api_information_for_each_player()
-        await self.table_handler.get_all_tables()
+        context = ScoutContext(message)
+        await self.table_handler.get_names_from_discord_message(context)
+        self.prewarm_scheduler.watch(context.guild_id, context.player_list, clash_api=False)
+        await self.scout_queue.submit(context)
+        return context
 
-    async def process_discord_message_single_player(self):
+    async def process_discord_message_single_player(self, message: object) -> ScoutContext:
         """
         Process the given discord message for the single player given
+
+        :param message: Discord message or interaction that started the command
+        :return: State of the processed command
         """
-        self.message_list = []
-        await self.table_handler.parse_discord_message_single_player()
-        await self.table_handler.get_api_information_for_each_player(clash_api=True)
-        await self.table_handler.get_all_tables(display_positions=True)
+        context = ScoutContext(message)
+        await self.table_handler.parse_discord_message_single_player(context)
+        self.prewarm_scheduler.watch(context.guild_id, context.player_list, clash_api=True)
+        await self.scout_queue.submit(context, clash_api=True)
+        return context
 
-    async def process_reaction_event(self):
+    async def run_scout(self, context: ScoutContext, clash_api: bool = False):
         """
-        Delete the message to call the bot and all of the bot's response messages
+        Run the queries and create every table for the command once its turn in the scout queue comes up
+
+        :param context: State of the command being processed
+        :param clash_api: If using a single player to leverage the clash API
+        """
+        with self.metrics.timer('scout_seconds', {'command': 'clash' if clash_api else 'scout'}):
+            await self.create_scout(context, clash_api)
+
+    async def create_scout(self, context: ScoutContext, clash_api: bool = False):
         """
-        if self.reaction_payload.emoji.name == '❌':
-            if str(self.reaction_payload.message_id) in self.message_history:
-                for message in self.message_history[str(self.reaction_payload.message_id)]:
-                    channel = await self.bot.fetch_channel(message['channel_id'])
-                    original_message = await channel.fetch_message(message['message_id'])
-                    await original_message.delete()
-                self.message_history.pop(str(self.reaction_payload.message_id))
-        self.save_message_history()
+        Run the queries and create every table for the command, or post the cached tables of the clash team
 
-    def save_message_history(self):
+        :param context: State of the command being processed
+        :param clash_api: If using a single player to leverage the clash API
         """
-        Save the message history
+        first_post = len(context.posts)
+        await self.table_handler.get_api_information_for_each_player(context, clash_api=clash_api,
+                                                                     query_clash_members=False)
+        clash_team_id = context.api_info.clash_team_id if clash_api else None
+        roster = None
+        if clash_team_id is not None:
+            # Skip every other query if the tables for the same roster were created recently
+            roster = self.scout_result_cache.get_roster(context.api_info.clash_team_members)
+            cached_posts = self.scout_result_cache.get(clash_team_id, roster)
+            if cached_posts is not None:
+                for post in cached_posts:
+                    await self.send(context, **post)
+                return
+        if clash_api and not self.table_handler.debug:
+            await self.table_handler.run_in_worker(context.api_info.query_clash_team)
+
+        await self.table_handler.get_all_tables(context, display_positions=clash_api)
+        if clash_team_id is not None and len(context.api_info.errors['no_clash_team']) == 0:
+            self.scout_result_cache.set(clash_team_id, roster, context.posts[first_post:])
+
+    async def process_reaction_event(self, reaction_payload: object):
         """
-        with open('../extra_files/message_history.json', 'w', encoding='utf-8') as message_history_file:
-            json.dump(self.message_history, message_history_file, indent=4)
+        Delete the message to call the bot and all of the bot's response messages
 
-    def load_message_history(self):
+        :param reaction_payload: Payload information about the reaction
         """
-        Load the message history for the bot
+        if reaction_payload.emoji.name == '❌':
+            messages = self.message_history.get(reaction_payload.message_id)
+            if len(messages) > 0:
+                message_ids = {}
+                for message in messages:
+                    message_ids.setdefault(message['channel_id'], []).append(message['message_id'])
+                await asyncio.gather(*[self.delete_channel_messages(channel_id, channel_message_ids)
+                                       for channel_id, channel_message_ids in message_ids.items()])
+                self.message_history.delete(reaction_payload.message_id)
+
+    async def delete_channel_messages(self, channel_id: int, message_ids: list):
         """
+        Delete the given messages from a channel without fetching them first. Messages new enough are deleted in bulk
+        and the rest are deleted at the same time as each other
 
-        # If the message_history.json file does not exist, create it
-        if not os.path.isfile('../extra_files/message_history.json'):
-            with open('../extra_files/message_history.json', 'w', encoding='utf-8') as message_history_file:
-                message_history_file.write('{\n}')
+        :param channel_id: Id of the channel holding the messages
+        :param message_ids: Id of each message to delete
+        """
+        channel = self.bot.get_channel(channel_id) or await self.bot.fetch_channel(channel_id)
+        partial_messages = [channel.get_partial_message(message_id) for message_id in message_ids]
 
-        # If the file does exist, read it and save it's values
-        else:
+        # Discord only bulk deletes between 2 and 100 messages younger than two weeks, and needs manage messages
+        bulk_cutoff = discord.utils.utcnow() - datetime.timedelta(days=13)
+        recent_messages = [message for message in partial_messages if message.created_at > bulk_cutoff]
+        if len(recent_messages) > 1 and hasattr(channel, 'delete_messages'):
             try:
-                with open('../extra_files/message_history.json', 'r', encoding='utf-8') as message_history_file:
-                    self.message_history = json.load(message_history_file)
+                for start in range(0, len(recent_messages), 100):
+                    await channel.delete_messages(recent_messages[start:start + 100])
+            except discord.Forbidden:
+                pass
+            else:
+                partial_messages = [message for message in partial_messages if message not in recent_messages]
 
-            # If the file is empty, create it an as empty dictionary
-            except json.decoder.JSONDecodeError:
-                with open('../extra_files/message_history.json', 'w', encoding='utf-8') as message_history_file:
-                    message_history_file.write('{\n}')
+        results = await asyncio.gather(*[message.delete() for message in partial_messages], return_exceptions=True)
+        for result in results:
+            if isinstance(result, Exception) and not isinstance(result, discord.NotFound):
+                raise result
 
-    async def save_last_request(self):
+    async def save_last_request(self, message: object):
         """
         Increase the save number to keep the last request so it may be used later for troubleshooting
+
+        :param message: Discord message that asked for the save
         """
         file_path = '../extra_files/save_number.txt'
         if os.path.isfile(file_path):
@@ -404,16 +570,18 @@ class DiscordBot:
             save_number = '1'
             with open(file_path, 'w') as my_number:
                 my_number.write(save_number)
-        await self.message.channel.send(f'Saved last query as number: {save_number}')
+        await message.channel.send(f'Saved last query as number: {save_number}')
 
-    async def clear_saved_queries(self):
+    async def clear_saved_queries(self, message: object):
         """
         Clear the saved queries once the bugs have been fixed
+
+        :param message: Discord message that asked for the clear
         """
         file_path = '../extra_files/save_number.txt'
         if os.path.isfile(file_path):
             os.remove(file_path)
-            await self.message.channel.send('Cleared all saved queries')
+            await message.channel.send('Cleared all saved queries')
 
     def start_bot(self):
         """
@@ -427,8 +595,8 @@ class DiscordBot:
             :param message: Context of the message
             """
             if not message.author.bot:
+                context = None
                 try:
-                    self.message = message
                     if message.content == '!clash help':
                         await message.channel.send('Clash Bot commands:\n'
                                                    '```'
@@ -449,16 +617,17 @@ class DiscordBot:
                                                    '-\tYou can use up to 5 summoner names.\n\n'
                                                    '```')
                     elif message.content[:7] == '!clash ':
-                        await self.process_discord_message()
+                        context = await self.process_discord_message(message)
                     elif message.content[:11] == '!clash_team':
-                        await self.process_discord_message_single_player()
+                        context = await self.process_discord_message_single_player(message)
                     elif message.content[:11] == '!clash_save':
-                        await self.save_last_request()
+                        await self.save_last_request(message)
                     elif message.content[:12] == '!clash_clear':
-                        await self.clear_saved_queries()
+                        await self.clear_saved_queries(message)
                     elif message.content[:6] == '!clash':
-                        self.message_list.append(await message.channel.send('Unknown command. Use "!clash help" for the '
-                                                                            'available options.'))
+                        context = ScoutContext(message)
+                        context.message_list.append(await message.channel.send('Unknown command. Use "!clash help" for '
+                                                                               'the available options.'))
 
                     # Stop processing if not a clash command
                     else:
@@ -467,15 +636,14 @@ class DiscordBot:
                 except Exception as exception:
                     await message.channel.send(f'Failed with error: {exception}')
 
-                # Add the messages to the message history dictionary
+                # Add the messages to the message history
                 else:
-                    if len(self.message_list) > 0:
-                        self.message_list.insert(0, message)
-                        self.message_history[f'{self.message_list[-1].id}'] = [{'channel_id': message.channel.id,
+                    if context is not None and len(context.message_list) > 0:
+                        context.message_list.insert(0, message)
+                        self.message_history.add(context.message_list[-1].id, [{'channel_id': message.channel.id,
                                                                                 'message_id': message.id} for message
-                                                                               in self.message_list]
-                        await self.message_list[-1].add_reaction('❌')
-                        self.save_message_history()
+                                                                               in context.message_list])
+                        await context.message_list[-1].add_reaction('❌')
 
         @self.bot.event
         async def on_ready():
@@ -485,7 +653,6 @@ class DiscordBot:
             if os.name == 'nt':
                 print('Ready')
             await self.bot.change_presence(activity=Activity(type=ActivityType.playing, name='/clash'))
-            self.load_message_history()
 
         @self.bot.event
         async def on_raw_reaction_add(reaction_payload: object):
@@ -495,24 +662,33 @@ class DiscordBot:
             :param reaction_payload: Payload information about the reaction
             """
             if not reaction_payload.member.bot:
-                self.reaction_payload = reaction_payload
-                await self.process_reaction_event()
+                await self.process_reaction_event(reaction_payload)
 
         @self.bot.tree.command(name='clash',
                            description='Gather information about a player\'s clash team',
                            guild=None)
         async def clash(message, player_name: str):
             await message.response.send_message(f"Starting to scout {player_name}'s team")
-            self.message = message
-            await self.process_discord_message_single_player()
+            await self.process_discord_message_single_player(message)
 
         @self.bot.tree.command(name='scout',
                            description='Gather information about a player(s)',
                            guild=None)
         async def scout(message: discord.Interaction, player_name: str):
             await message.response.send_message(f"Starting to scout: {player_name}")
-            self.message = message
-            await self.process_discord_message()
+            await self.process_discord_message(message)
+
+        # Load the champion data once and keep it up to date in the background
+        get_static_data().start()
+
+        # Fetch the data for the players scouted before each clash tournament
+        self.prewarm_scheduler.start()
+
+        # Serve the latency of each stage of the scouts for Prometheus
+        self.metrics.start_server()
+
+        # Every command uploads its own images, so AWS deletes them once the command is old enough to not be looked at
+        aws.AWSHandler().expire_images(ScoutContext.image_prefix, int(os.getenv('IMAGE_EXPIRY_DAYS', 30)))
 
         # Run the bot
         self.bot.run(os.getenv('DISCORD_TOKEN'))
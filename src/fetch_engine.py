@@ -0,0 +1,182 @@
+"""
+This file runs the outbound requests for the API queries concurrently on a dedicated event loop, sharing one pool of
+keep-alive connections between every query
+"""
+
+import asyncio
+import json
+import os
+import threading
+import time
+from urllib.error import HTTPError
+from urllib.parse import urlsplit
+
+import aiohttp
+
+from metrics import get_metrics
+from process_shared import shared_instance
+from rate_limiter import RiotRateLimiter
+
+
+class FetchEngine:
+    """
+    Run coroutines on a background event loop and fetch urls concurrently within a per host limit
+    """
+    def __init__(self, max_requests_per_host: int = 8, max_retries: int = 3):
+        """
+        Run coroutines on a background event loop and fetch urls concurrently within a per host limit
+
+        :param max_requests_per_host: Maximum number of connections open at once to a single host
+        :param max_retries: Number of times to retry a request which was rate limited
+        """
+        self.max_requests_per_host = max_requests_per_host
+        self.max_retries = max_retries
+
+        # Low priority requests, such as pre-warming, may only use a few of the connections to each host so the
+        # commands never queue behind them for a connection
+        self.max_low_priority_requests_per_host = min(int(os.getenv('LOW_PRIORITY_REQUESTS_PER_HOST', 2)),
+                                                      max_requests_per_host - 1)
+        self.low_priority_semaphores = {}
+        self.session = None
+        self.rate_limiter = RiotRateLimiter()
+        self.metrics = get_metrics()
+        self.metrics.add_gauge('riot_rate_limit_remaining', self.get_budget_series)
+
+        # Connections are kept alive between requests and scouts so only the first request to a host pays the handshake
+        self.keepalive_timeout = 60
+        self.timeout = aiohttp.ClientTimeout(total=60, connect=5, sock_read=20)
+        self.headers = {'Accept-Encoding': 'gzip, deflate'}
+        self.loop = asyncio.new_event_loop()
+        self.thread = threading.Thread(target=self.loop.run_forever, name='fetch_engine', daemon=True)
+        self.thread.start()
+
+    def run(self, coroutine):
+        """
+        Run the given coroutine on the engine's event loop and wait for the result
+
+        :param coroutine: Coroutine to run
+        :return: Result of the coroutine
+        """
+        return asyncio.run_coroutine_threadsafe(coroutine, self.loop).result()
+
+    async def run_async(self, coroutine):
+        """
+        Run the given coroutine on the engine's event loop and wait for the result without blocking the calling loop
+
+        :param coroutine: Coroutine to run
+        :return: Result of the coroutine
+        """
+        return await asyncio.wrap_future(asyncio.run_coroutine_threadsafe(coroutine, self.loop))
+
+    def get_session(self) -> aiohttp.ClientSession:
+        """
+        Get the client session shared by every request, creating it on the engine's event loop if needed
+
+        :return: Shared client session
+        """
+        if self.session is None or self.session.closed:
+            connector = aiohttp.TCPConnector(limit_per_host=self.max_requests_per_host,
+                                             keepalive_timeout=self.keepalive_timeout, ttl_dns_cache=300)
+            self.session = aiohttp.ClientSession(connector=connector, timeout=self.timeout, headers=self.headers)
+        return self.session
+
+    async def request(self, method: str, url: str, low_priority: bool = False, **kwargs) -> str:
+        """
+        Send a request once the rate limiter allows it and return the body of the response. Low priority requests first
+        wait for one of the few connections to the host they are allowed to use
+
+        :param method: HTTP method to use. e.g. GET
+        :param url: Url to request
+        :param low_priority: Leave part of the rate limits and connections for the other requests. e.g. when
+                             pre-warming
+        :param kwargs: Extra arguments passed to the session request such as data or headers
+        :return: Text of the response
+        """
+        if not low_priority:
+            return await self.send_request(method, url, low_priority, **kwargs)
+        host = urlsplit(url).netloc
+        if host not in self.low_priority_semaphores:
+            self.low_priority_semaphores[host] = asyncio.Semaphore(self.max_low_priority_requests_per_host)
+        async with self.low_priority_semaphores[host]:
+            return await self.send_request(method, url, low_priority, **kwargs)
+
+    async def send_request(self, method: str, url: str, low_priority: bool = False, **kwargs) -> str:
+        """
+        Send a request once the rate limiter allows it and return the body of the response. Rate limited responses are
+        retried after the wait given by the response, up to max_retries times
+
+        :param method: HTTP method to use. e.g. GET
+        :param url: Url to request
+        :param low_priority: Leave part of the rate limits for the other requests. e.g. when pre-warming
+        :param kwargs: Extra arguments passed to the session request such as data or headers
+        :return: Text of the response
+        """
+        labels = {'host': urlsplit(url).netloc, 'endpoint': self.get_endpoint(url)}
+        for attempt in range(self.max_retries + 1):
+            with self.metrics.timer('rate_limit_wait_seconds', labels):
+                await self.rate_limiter.acquire(url, low_priority)
+            start = time.perf_counter()
+            try:
+                async with self.get_session().request(method, url, **kwargs) as response:
+                    text = await response.text()
+            except (aiohttp.ClientError, asyncio.TimeoutError, asyncio.CancelledError):
+                self.rate_limiter.cancel(url)
+                self.metrics.increment('http_requests_total', {**labels, 'status': 'error'})
+                raise
+            self.metrics.observe('http_request_seconds', time.perf_counter() - start, labels)
+            self.metrics.increment('http_requests_total', {**labels, 'status': response.status})
+            self.rate_limiter.update(url, response.status, response.headers)
+            if response.status == 429 and attempt < self.max_retries:
+                print(f'\tRate limited on {self.rate_limiter.get_method(url)}, retrying')
+                continue
+            if response.status >= 400:
+                raise HTTPError(url, response.status, response.reason, response.headers, None)
+            return text
+
+    def get_endpoint(self, url: str) -> str:
+        """
+        Get the endpoint of the url without any names or ids in it so it can be used as a metric label
+
+        :param url: Url being requested
+        :return: Riot method, or the first segment of the path for any other host. e.g. lol/clash/v1/teams, lol
+        """
+        if self.rate_limiter.is_riot_url(url):
+            return self.rate_limiter.get_method(url)
+        return urlsplit(url).path.strip('/').split('/')[0]
+
+    def get_budget_series(self) -> list:
+        """
+        Get the remaining Riot rate limit budget of each host and method for the metrics. The metrics are collected on
+        their own thread, so the budget is read on the engine's event loop where the rate limiter is updated
+
+        :return: Labels and remaining budget of each limit
+        """
+        async def get_budget_summary() -> dict:
+            return self.rate_limiter.budget_summary()
+
+        series = []
+        summary = asyncio.run_coroutine_threadsafe(get_budget_summary(), self.loop).result(timeout=5)
+        for host, budget in summary.items():
+            series.append(({'host': host, 'method': 'application'}, budget['application']))
+            series += [({'host': host, 'method': method}, remaining) for method, remaining in budget['methods'].items()]
+        return series
+
+    async def get_json(self, url: str, low_priority: bool = False):
+        """
+        Query the given url to get it's json response
+
+        :param url: Url to request
+        :param low_priority: Leave part of the rate limits for the other requests. e.g. when pre-warming
+        :return: Json object of the url request
+        """
+        return json.loads(await self.request('GET', url, low_priority))
+
+
+@shared_instance
+def get_fetch_engine() -> FetchEngine:
+    """
+    Get the fetch engine shared by every query in the process
+
+    :return: Shared fetch engine
+    """
+    return FetchEngine()
@@ -0,0 +1,98 @@
+"""
+This file rasterises the table font once so the tables can be drawn by copying glyphs instead of drawing text
+"""
+
+import threading
+
+from PIL import Image, ImageDraw, ImageFont
+
+from process_shared import shared_instance
+
+
+class GlyphAtlas:
+    """
+    Bold glyph masks for every character of a monospaced font at a single size. Printable ASCII is rasterised up front
+    into one atlas image and any other character, such as accented summoner names, is added the first time it is seen
+    """
+    def __init__(self, font_path: str = '../extra_files/cour.ttf', size: int = 20, boldness: int = 5):
+        """
+        Bold glyph masks for every character of a monospaced font at a single size
+
+        :param font_path: Location of the monospaced font
+        :param size: Size of the font in pixels
+        :param boldness: Number of times the text used to be drawn over itself to make it bold
+        """
+        self.font = ImageFont.truetype(font_path, size)
+        self.boldness = boldness
+        self.advance = int(self.font.getlength('M'))
+        ascent, descent = self.font.getmetrics()
+        self.line_height = ImageDraw.Draw(Image.new('L', (1, 1))).textbbox((0, 0), 'A\nA', font=self.font)[3] - \
+            self.font.getbbox('A')[3]
+
+        # Glyphs are rasterised with some padding so characters wider than the advance are not clipped
+        self.padding = 4
+        self.cell_width = self.advance + self.padding * 2
+        self.cell_height = ascent + descent + self.padding * 2
+        self.glyphs = {}
+        self.lock = threading.Lock()
+
+        characters = [chr(code) for code in range(33, 127)]
+        self.atlas = Image.new('L', (self.cell_width * len(characters), self.cell_height))
+        for cnt, character in enumerate(characters):
+            self.atlas.paste(self.rasterise(character), (cnt * self.cell_width, 0))
+        for cnt, character in enumerate(characters):
+            self.glyphs[character] = self.atlas.crop((cnt * self.cell_width, 0, (cnt + 1) * self.cell_width,
+                                                      self.cell_height))
+
+    def rasterise(self, character: str) -> Image.Image:
+        """
+        Rasterise a single bold glyph. Drawing anti-aliased text n times leaves a coverage of 1 - (1 - a)^n, so the
+        mask is built with that curve to match the text drawn five times over itself
+
+        :param character: Character to rasterise
+        :return: Mask of the glyph
+        """
+        glyph = Image.new('L', (self.cell_width, self.cell_height))
+        ImageDraw.Draw(glyph).text((self.padding, self.padding), character, font=self.font, fill=255)
+        return glyph.point(lambda alpha: round(255 * (1 - (1 - alpha / 255) ** self.boldness)))
+
+    def get_glyph(self, character: str) -> Image.Image:
+        """
+        Get the mask for a character, rasterising it if it is not in the atlas yet
+
+        :param character: Character to draw
+        :return: Mask of the glyph
+        """
+        glyph = self.glyphs.get(character)
+        if glyph is None:
+            with self.lock:
+                glyph = self.glyphs.setdefault(character, self.rasterise(character))
+        return glyph
+
+    def draw_text(self, img: Image.Image, position: tuple, text: str, colour: tuple):
+        """
+        Copy the glyphs of the text onto the image
+
+        :param img: Image to draw on
+        :param position: Pixel position of the top left of the text
+        :param text: Text to draw, may contain new lines
+        :param colour: RGB colour of the text
+        """
+        for line_cnt, line in enumerate(text.split('\n')):
+            y_position = position[1] + line_cnt * self.line_height - self.padding
+            for character_cnt, character in enumerate(line):
+                if character != ' ':
+                    img.paste(colour, (position[0] + character_cnt * self.advance - self.padding, y_position),
+                              self.get_glyph(character))
+
+
+@shared_instance
+def get_glyph_atlas(font_path: str = '../extra_files/cour.ttf', size: int = 20) -> GlyphAtlas:
+    """
+    Get the glyph atlas for the font and size shared by the process
+
+    :param font_path: Location of the monospaced font
+    :param size: Size of the font in pixels
+    :return: Shared glyph atlas
+    """
+    return GlyphAtlas(font_path, size)
@@ -9,14 +9,16 @@ class MasteryShared:
     """
     Handle creating the mastery shared table
     """
-    def __init__(self, api_results: object, title_colours: list):
+    def __init__(self, api_results: object, title_colours: list, file_prefix: str = ''):
         """
         Handle creating the mastery shared table
 
         :param api_results: Results from the api_queries file
         :param title_colours: Title colour for each player based on the player rank
+        :param file_prefix: Prefix to add to the image file name
         """
         self.api_results = api_results
+        self.file_prefix = file_prefix
         self.title_colours = title_colours[:]
         self.titles = None
         self.columns = []
@@ -45,7 +47,7 @@ class MasteryShared:
         """
         Create image from the processed results
         """
-        CreateImage(self.titles, self.columns, '../extra_files/mastery_shared.png',
+        CreateImage(self.titles, self.columns, f'{self.file_prefix}mastery_shared.png',
                     colour=self.colour_columns, convert_columns=True, title_colours=self.title_colours)
 
     def adjust_titles(self):
@@ -0,0 +1,145 @@
+"""
+This file keeps a local copy of each player's match history so only games newer than the last scout need fetching
+"""
+
+import datetime
+import json
+import threading
+import time
+
+from process_shared import open_database, shared_instance
+
+
+class MatchHistoryStore:
+    """
+    SQLite backed store of the match history for each player and queue along with the newest game seen
+    """
+    def __init__(self, path: str = '../extra_files/match_history.sqlite'):
+        """
+        SQLite backed store of the match history for each player and queue along with the newest game seen
+
+        :param path: Location of the SQLite database
+        """
+        self.path = path
+        self.lock = threading.Lock()
+
+        self.connection = open_database(self.path)
+        self.connection.execute('CREATE TABLE IF NOT EXISTS histories (puuid TEXT NOT NULL, queue TEXT NOT NULL, '
+                                'newest_created_at TEXT, matches TEXT NOT NULL, updated_at REAL NOT NULL, '
+                                'PRIMARY KEY (puuid, queue))')
+        self.connection.execute('CREATE TABLE IF NOT EXISTS refreshes (puuid TEXT PRIMARY KEY, '
+                                'refreshed_at REAL NOT NULL)')
+        self.connection.commit()
+
+    @staticmethod
+    def parse_created_at(created_at: str) -> datetime.datetime:
+        """
+        Convert the created_at time of an op.gg game into a datetime so games can be compared
+
+        :param created_at: Time the game was created. e.g. 2024-05-01T12:34:56+09:00
+        :return: Timezone aware datetime of the game
+        """
+        return datetime.datetime.fromisoformat(created_at)
+
+    def get_newest_created_at(self, puuid: str, queue: str):
+        """
+        Get the creation time of the newest game stored for the player in the given queue
+
+        :param puuid: Op.gg puuid of the player
+        :param queue: Op.gg queue type. e.g. SOLORANKED
+        :return: Datetime of the newest game, or None if the queue has never been synced for the player
+        """
+        with self.lock:
+            row = self.connection.execute('SELECT newest_created_at FROM histories WHERE puuid = ? AND queue = ?',
+                                          (puuid, queue)).fetchone()
+        if row is None:
+            return None
+        if row[0] is None:
+            return datetime.datetime.min.replace(tzinfo=datetime.timezone.utc)
+        return self.parse_created_at(row[0])
+
+    def is_queue_empty(self, puuid: str, queue: str, recheck_interval: float) -> bool:
+        """
+        Check if the player had no games in the queue when it was last synced, within the recheck interval
+
+        :param puuid: Op.gg puuid of the player
+        :param queue: Op.gg queue type. e.g. SOLORANKED
+        :param recheck_interval: Number of seconds before an empty queue should be checked again
+        """
+        with self.lock:
+            row = self.connection.execute('SELECT newest_created_at, updated_at FROM histories WHERE puuid = ? AND '
+                                          'queue = ?', (puuid, queue)).fetchone()
+        return row is not None and row[0] is None and time.time() - row[1] < recheck_interval
+
+    def get_refreshed_at(self, puuid: str) -> float:
+        """
+        Get the last time op.gg was asked to refresh the player
+
+        :param puuid: Op.gg puuid of the player
+        :return: Epoch time of the last refresh, or 0 if the player has never been refreshed
+        """
+        with self.lock:
+            row = self.connection.execute('SELECT refreshed_at FROM refreshes WHERE puuid = ?', (puuid,)).fetchone()
+        return 0.0 if row is None else row[0]
+
+    def set_refreshed_at(self, puuid: str, refreshed_at: float):
+        """
+        Save the last time op.gg was asked to refresh the player
+
+        :param puuid: Op.gg puuid of the player
+        :param refreshed_at: Epoch time of the refresh
+        """
+        with self.lock:
+            self.connection.execute('INSERT OR REPLACE INTO refreshes (puuid, refreshed_at) VALUES (?, ?)',
+                                    (puuid, refreshed_at))
+            self.connection.commit()
+
+    def get_matches(self, puuid: str, queue: str) -> list:
+        """
+        Get every stored game for the player in the given queue
+
+        :param puuid: Op.gg puuid of the player
+        :param queue: Op.gg queue type. e.g. SOLORANKED
+        :return: Stored games, newest first
+        """
+        with self.lock:
+            row = self.connection.execute('SELECT matches FROM histories WHERE puuid = ? AND queue = ?',
+                                          (puuid, queue)).fetchone()
+        return [] if row is None else json.loads(row[0])
+
+    def merge(self, puuid: str, queue: str, new_matches: list, max_games: int,
+              window_start: datetime.datetime = None) -> list:
+        """
+        Merge newly fetched games into the stored history for the player and save it
+
+        :param puuid: Op.gg puuid of the player
+        :param queue: Op.gg queue type. e.g. SOLORANKED
+        :param new_matches: Games fetched since the last sync
+        :param max_games: Maximum number of games to keep for the queue
+        :param window_start: Games created before this time are dropped from the history
+        :return: The merged history, newest first
+        """
+        matches = {match['created_at']: match for match in self.get_matches(puuid, queue)}
+        for match in new_matches:
+            matches[match['created_at']] = match
+        merged = sorted(matches.values(), key=lambda match: self.parse_created_at(match['created_at']),
+                        reverse=True)[:max_games]
+        if window_start is not None:
+            merged = [match for match in merged if self.parse_created_at(match['created_at']) >= window_start]
+        newest_created_at = merged[0]['created_at'] if merged else None
+        with self.lock:
+            self.connection.execute('INSERT OR REPLACE INTO histories (puuid, queue, newest_created_at, matches, '
+                                    'updated_at) VALUES (?, ?, ?, ?, ?)',
+                                    (puuid, queue, newest_created_at, json.dumps(merged), time.time()))
+            self.connection.commit()
+        return merged
+
+
+@shared_instance
+def get_match_history_store() -> MatchHistoryStore:
+    """
+    Get the match history store shared by every query in the process
+
+    :return: Shared match history store
+    """
+    return MatchHistoryStore()
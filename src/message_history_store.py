@@ -0,0 +1,117 @@
+"""
+This file keeps track of the messages posted for each command so they can all be deleted when the ❌ reaction is added
+"""
+
+import json
+import os
+import threading
+import time
+
+from process_shared import open_database, shared_instance
+
+
+class MessageHistoryStore:
+    """
+    SQLite backed store of the messages belonging to each command, indexed by the bot message holding the ❌ reaction.
+    Entries older than the maximum age are removed
+    """
+    def __init__(self, path: str = '../extra_files/message_history.sqlite', max_age: int = None,
+                 legacy_path: str = '../extra_files/message_history.json'):
+        """
+        SQLite backed store of the messages belonging to each command
+
+        :param path: Location of the SQLite database
+        :param max_age: Number of seconds a command can still be deleted for
+        :param legacy_path: Location of the old JSON message history to import the first time the store is created
+        """
+        self.path = path
+        self.max_age = max_age or int(os.getenv('MESSAGE_HISTORY_MAX_AGE', 30 * 24 * 60 * 60))
+        self.expire_interval = 60 * 60
+        self.last_expired = 0
+        self.lock = threading.Lock()
+
+        self.connection = open_database(self.path)
+        self.connection.execute('CREATE TABLE IF NOT EXISTS messages (reaction_message_id TEXT NOT NULL, '
+                                'channel_id INTEGER NOT NULL, message_id INTEGER NOT NULL, created_at REAL NOT NULL)')
+        self.connection.execute('CREATE INDEX IF NOT EXISTS messages_reaction_message_id ON messages '
+                                '(reaction_message_id)')
+        self.connection.execute('CREATE INDEX IF NOT EXISTS messages_created_at ON messages (created_at)')
+        self.connection.commit()
+        self.import_legacy_history(legacy_path)
+
+    def import_legacy_history(self, legacy_path: str):
+        """
+        Import the messages from the old JSON message history and move the file out of the way so it is only imported
+        once
+
+        :param legacy_path: Location of the old JSON message history
+        """
+        if not os.path.isfile(legacy_path):
+            return
+        try:
+            with open(legacy_path, 'r', encoding='utf-8') as message_history_file:
+                message_history = json.load(message_history_file)
+        except json.decoder.JSONDecodeError:
+            message_history = {}
+        for reaction_message_id, messages in message_history.items():
+            self.add(reaction_message_id, messages)
+        os.replace(legacy_path, f'{legacy_path}.imported')
+
+    def add(self, reaction_message_id: str, messages: list):
+        """
+        Save the messages belonging to a command
+
+        :param reaction_message_id: Id of the bot message holding the ❌ reaction
+        :param messages: Each message as a dictionary of its channel_id and message_id
+        """
+        now = time.time()
+        with self.lock:
+            self.connection.executemany('INSERT INTO messages (reaction_message_id, channel_id, message_id, '
+                                        'created_at) VALUES (?, ?, ?, ?)',
+                                        [(str(reaction_message_id), message['channel_id'], message['message_id'], now)
+                                         for message in messages])
+            if now - self.last_expired > self.expire_interval:
+                self.expire(now)
+            self.connection.commit()
+
+    def get(self, reaction_message_id: str) -> list:
+        """
+        Get the messages belonging to the command with the given ❌ reaction message
+
+        :param reaction_message_id: Id of the bot message holding the ❌ reaction
+        :return: Each message as a dictionary of its channel_id and message_id, or an empty list if it is not a command
+        """
+        with self.lock:
+            rows = self.connection.execute('SELECT channel_id, message_id FROM messages WHERE reaction_message_id = ? '
+                                           'AND created_at > ? ORDER BY rowid',
+                                           (str(reaction_message_id), time.time() - self.max_age)).fetchall()
+        return [{'channel_id': channel_id, 'message_id': message_id} for channel_id, message_id in rows]
+
+    def delete(self, reaction_message_id: str):
+        """
+        Remove the messages belonging to the command with the given ❌ reaction message
+
+        :param reaction_message_id: Id of the bot message holding the ❌ reaction
+        """
+        with self.lock:
+            self.connection.execute('DELETE FROM messages WHERE reaction_message_id = ?', (str(reaction_message_id),))
+            self.connection.commit()
+
+    def expire(self, now: float):
+        """
+        Remove the messages older than the maximum age
+
+        :param now: Current epoch time
+        """
+        self.connection.execute('DELETE FROM messages WHERE created_at <= ?', (now - self.max_age,))
+        self.last_expired = now
+
+
+@shared_instance
+def get_message_history_store() -> MessageHistoryStore:
+    """
+    Get the message history store shared by the process
+
+    :return: Shared message history store
+    """
+    return MessageHistoryStore()
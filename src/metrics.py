@@ -0,0 +1,198 @@
+"""
+This file records the counts and latencies of each stage of a scout and serves them in the Prometheus text format
+"""
+
+import os
+import threading
+import time
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from process_shared import shared_instance
+
+
+class Metrics:
+    """
+    Thread safe store of counters, latency histograms and gauges read when the metrics are collected
+    """
+    def __init__(self, prefix: str = 'clashbot', buckets: tuple = None):
+        """
+        Thread safe store of counters, latency histograms and gauges
+
+        :param prefix: Prefix added to the name of every metric
+        :param buckets: Upper bound in seconds of each histogram bucket
+        """
+        self.prefix = prefix
+        self.buckets = buckets or (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300)
+        self.counters = {}
+        self.histograms = {}
+        self.gauges = {}
+        self.lock = threading.Lock()
+        self.server = None
+
+    @staticmethod
+    def get_labels(labels: dict) -> tuple:
+        """
+        Convert the labels into a key which can be stored in a dictionary
+
+        :param labels: Label names and values. e.g. {'host': 'na1'}
+        :return: Sorted tuple of each label name and value
+        """
+        return tuple(sorted((name, str(value)) for name, value in (labels or {}).items()))
+
+    def increment(self, name: str, labels: dict = None, amount: float = 1):
+        """
+        Increase a counter
+
+        :param name: Name of the counter. e.g. http_requests_total
+        :param labels: Label names and values of the counter
+        :param amount: Amount to increase the counter by
+        """
+        key = (name, self.get_labels(labels))
+        with self.lock:
+            self.counters[key] = self.counters.get(key, 0) + amount
+
+    def observe(self, name: str, seconds: float, labels: dict = None):
+        """
+        Add a latency to a histogram
+
+        :param name: Name of the histogram. e.g. http_request_seconds
+        :param seconds: Latency to add
+        :param labels: Label names and values of the histogram
+        """
+        key = (name, self.get_labels(labels))
+        with self.lock:
+            if key not in self.histograms:
+                self.histograms[key] = {'buckets': [0] * len(self.buckets), 'sum': 0.0, 'count': 0}
+            histogram = self.histograms[key]
+            for cnt, upper_bound in enumerate(self.buckets):
+                if seconds <= upper_bound:
+                    histogram['buckets'][cnt] += 1
+            histogram['sum'] += seconds
+            histogram['count'] += 1
+
+    @contextmanager
+    def timer(self, name: str, labels: dict = None):
+        """
+        Add the time taken by the block to a histogram, even if the block raises
+
+        :param name: Name of the histogram. e.g. http_request_seconds
+        :param labels: Label names and values of the histogram
+        """
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(name, time.perf_counter() - start, labels)
+
+    def add_gauge(self, name: str, callback):
+        """
+        Add a gauge which is read every time the metrics are collected
+
+        :param name: Name of the gauge. e.g. page_cache_bytes
+        :param callback: Function returning a list of the labels and value of each series of the gauge
+        """
+        with self.lock:
+            self.gauges[name] = callback
+
+    @staticmethod
+    def escape_label(value: str) -> str:
+        """
+        Escape a label value for the Prometheus text format
+
+        :param value: Label value
+        :return: Label value with backslashes, quotes and new lines escaped
+        """
+        return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+    def format_series(self, name: str, labels: tuple, value: float) -> str:
+        """
+        Format a single line of the Prometheus text format
+
+        :param name: Name of the series without the prefix
+        :param labels: Sorted tuple of each label name and value
+        :param value: Value of the series
+        :return: Line of the series. e.g. clashbot_http_requests_total{host="na1"} 3
+        """
+        label_text = ','.join(f'{label}="{self.escape_label(label_value)}"' for label, label_value in labels)
+        return f'{self.prefix}_{name}{{{label_text}}} {value}' if label_text else f'{self.prefix}_{name} {value}'
+
+    def render(self) -> str:
+        """
+        Get every metric in the Prometheus text format
+
+        :return: Text of every metric
+        """
+        lines = []
+        with self.lock:
+            counters = dict(self.counters)
+            histograms = {key: {'buckets': histogram['buckets'][:], 'sum': histogram['sum'],
+                                'count': histogram['count']} for key, histogram in self.histograms.items()}
+            gauges = dict(self.gauges)
+
+        for name in sorted({name for name, _ in counters}):
+            lines.append(f'# TYPE {self.prefix}_{name} counter')
+            lines += [self.format_series(name, labels, value) for (series, labels), value in sorted(counters.items())
+                      if series == name]
+
+        for name in sorted({name for name, _ in histograms}):
+            lines.append(f'# TYPE {self.prefix}_{name} histogram')
+            for (series, labels), histogram in sorted(histograms.items()):
+                if series != name:
+                    continue
+                for upper_bound, count in zip(self.buckets, histogram['buckets']):
+                    lines.append(self.format_series(f'{name}_bucket', labels + (('le', str(upper_bound)),), count))
+                lines.append(self.format_series(f'{name}_bucket', labels + (('le', '+Inf'),), histogram['count']))
+                lines.append(self.format_series(f'{name}_sum', labels, histogram['sum']))
+                lines.append(self.format_series(f'{name}_count', labels, histogram['count']))
+
+        for name, callback in sorted(gauges.items()):
+            try:
+                series = callback()
+            except Exception as exception:
+                print(f'Failed to read the {name} gauge: {exception}')
+                continue
+            lines.append(f'# TYPE {self.prefix}_{name} gauge')
+            lines += [self.format_series(name, self.get_labels(labels), value) for labels, value in series]
+        return '\n'.join(lines) + '\n'
+
+    def start_server(self, port: int = None, host: str = None):
+        """
+        Serve the metrics over HTTP in the background. e.g. curl http://127.0.0.1:9108/metrics
+
+        :param port: Port to listen on, 0 to not serve the metrics
+        :param host: Address to listen on
+        """
+        port = int(os.getenv('METRICS_PORT', 9108)) if port is None else port
+        host = host or os.getenv('METRICS_HOST', '127.0.0.1')
+        if self.server is not None or port == 0:
+            return
+        metrics = self
+
+        class MetricsRequestHandler(BaseHTTPRequestHandler):
+            """
+            Respond to every GET request with the current metrics
+            """
+            def do_GET(self):
+                body = metrics.render().encode('utf-8')
+                self.send_response(200)
+                self.send_header('Content-Type', 'text/plain; version=0.0.4; charset=utf-8')
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        self.server = ThreadingHTTPServer((host, port), MetricsRequestHandler)
+        threading.Thread(target=self.server.serve_forever, name='metrics', daemon=True).start()
+
+
+@shared_instance
+def get_metrics() -> Metrics:
+    """
+    Get the metrics shared by the process
+
+    :return: Shared metrics
+    """
+    return Metrics()
@@ -0,0 +1,159 @@
+"""
+This file keeps the op.gg pages on disk so they can be reused between queries and restarts of the bot
+"""
+
+import os
+import threading
+import time
+
+from metrics import get_metrics
+from process_shared import open_database, shared_instance
+
+
+class PageCache:
+    """
+    SQLite backed cache of page bodies with a time to live for each entry and a total size limit
+    """
+    def __init__(self, path: str = '../extra_files/op_gg_cache.sqlite', max_bytes: int = None):
+        """
+        SQLite backed cache of page bodies with a time to live for each entry and a total size limit
+
+        :param path: Location of the SQLite database
+        :param max_bytes: Total size of the cached bodies before the least recently used entries are evicted
+        """
+        self.path = path
+        self.max_bytes = max_bytes or int(os.getenv('OP_GG_CACHE_MAX_BYTES', 100 * 1024 * 1024))
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.metrics = get_metrics()
+        self.lock = threading.Lock()
+
+        # Cache hits run on the fetch engine's event loop, so the time each entry was last used is kept in memory and
+        # written in batches instead of committing on every hit
+        self.pending_accesses = {}
+        self.max_pending_accesses = 100
+        self.access_flush_interval = 60
+        self.last_access_flush = time.time()
+
+        self.connection = open_database(self.path)
+        self.connection.execute('CREATE TABLE IF NOT EXISTS pages (key TEXT PRIMARY KEY, body TEXT NOT NULL, '
+                                'size INTEGER NOT NULL, expires_at REAL NOT NULL, last_access REAL NOT NULL)')
+        self.connection.execute('CREATE INDEX IF NOT EXISTS pages_last_access ON pages (last_access)')
+        self.connection.commit()
+        self.total_bytes = self.connection.execute('SELECT COALESCE(SUM(size), 0) FROM pages').fetchone()[0]
+        self.metrics.add_gauge('page_cache_bytes', lambda: [({}, self.total_bytes)])
+
+    def get(self, key: str):
+        """
+        Get the cached body for the given key
+
+        :param key: Key the body was saved under
+        :return: The body, or None if it is not cached or has expired
+        """
+        now = time.time()
+        with self.lock:
+            row = self.connection.execute('SELECT body, size, expires_at FROM pages WHERE key = ?', (key,)).fetchone()
+            if row is None:
+                self.misses += 1
+                self.metrics.increment('page_cache_requests_total', {'result': 'miss'})
+                return None
+            body, size, expires_at = row
+            if expires_at <= now:
+                self.connection.execute('DELETE FROM pages WHERE key = ?', (key,))
+                self.connection.commit()
+                self.total_bytes -= size
+                self.misses += 1
+                self.metrics.increment('page_cache_requests_total', {'result': 'miss'})
+                return None
+            self.pending_accesses[key] = now
+            if len(self.pending_accesses) >= self.max_pending_accesses or \
+                    now - self.last_access_flush >= self.access_flush_interval:
+                self.flush_accesses()
+                self.connection.commit()
+            self.hits += 1
+            self.metrics.increment('page_cache_requests_total', {'result': 'hit'})
+            return body
+
+    def set(self, key: str, body: str, ttl: float):
+        """
+        Save the body under the given key
+
+        :param key: Key to save the body under
+        :param body: Body of the page
+        :param ttl: Number of seconds the entry stays valid for
+        """
+        now = time.time()
+        size = len(body.encode('utf-8'))
+        with self.lock:
+            row = self.connection.execute('SELECT size FROM pages WHERE key = ?', (key,)).fetchone()
+            if row is not None:
+                self.total_bytes -= row[0]
+            self.connection.execute('INSERT OR REPLACE INTO pages (key, body, size, expires_at, last_access) '
+                                    'VALUES (?, ?, ?, ?, ?)', (key, body, size, now + ttl, now))
+            self.pending_accesses.pop(key, None)
+            self.total_bytes += size
+            self.evict()
+            self.connection.commit()
+
+    def delete(self, key: str):
+        """
+        Remove the entry for the given key if it exists
+
+        :param key: Key the body was saved under
+        """
+        with self.lock:
+            row = self.connection.execute('SELECT size FROM pages WHERE key = ?', (key,)).fetchone()
+            if row is not None:
+                self.connection.execute('DELETE FROM pages WHERE key = ?', (key,))
+                self.connection.commit()
+                self.total_bytes -= row[0]
+
+    def flush_accesses(self):
+        """
+        Write the times the entries were last used to the database. The caller holds the lock and commits
+        """
+        if self.pending_accesses:
+            self.connection.executemany('UPDATE pages SET last_access = ? WHERE key = ?',
+                                        [(last_access, key) for key, last_access in self.pending_accesses.items()])
+            self.pending_accesses = {}
+        self.last_access_flush = time.time()
+
+    def evict(self):
+        """
+        Remove expired entries, then the least recently used entries until the cache fits within max_bytes
+        """
+        if self.total_bytes <= self.max_bytes:
+            return
+        self.flush_accesses()
+        self.connection.execute('DELETE FROM pages WHERE expires_at <= ?', (time.time(),))
+        self.total_bytes = self.connection.execute('SELECT COALESCE(SUM(size), 0) FROM pages').fetchone()[0]
+        rows = self.connection.execute('SELECT key, size FROM pages ORDER BY last_access').fetchall()
+        for key, size in rows:
+            if self.total_bytes <= self.max_bytes:
+                break
+            self.connection.execute('DELETE FROM pages WHERE key = ?', (key,))
+            self.total_bytes -= size
+            self.evictions += 1
+            self.metrics.increment('page_cache_evictions_total')
+
+    def stats(self) -> dict:
+        """
+        Get the counters for the cache
+
+        :return: Dictionary of the hits, misses, evictions, number of entries and total size
+        """
+        with self.lock:
+            entries = self.connection.execute('SELECT COUNT(*) FROM pages').fetchone()[0]
+            return {'hits': self.hits, 'misses': self.misses, 'evictions': self.evictions, 'entries': entries,
+                    'bytes': self.total_bytes}
+
+
+@shared_instance
+def get_page_cache() -> PageCache:
+    """
+    Get the page cache shared by every query in the process
+
+    :return: Shared page cache
+    """
+    return PageCache()
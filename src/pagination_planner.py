@@ -0,0 +1,106 @@
+"""
+This file decides which page of an op.gg match history to request next and when to stop paging
+"""
+
+import datetime
+
+
+class PaginationPlanner:
+    """
+    Plan the pages of a single queue's match history. Paging stops once the history goes past the time window, reaches
+    the games already stored, reaches the number of games wanted or runs out of pages
+    """
+    def __init__(self, window_start: datetime.datetime, max_games: int, max_pages: int = 5,
+                 newest_stored: datetime.datetime = None):
+        """
+        Plan the pages of a single queue's match history
+
+        :param window_start: Oldest game creation time to include
+        :param max_games: Number of games wanted from the queue
+        :param max_pages: Maximum number of pages to request
+        :param newest_stored: Creation time of the newest game already stored, or None if nothing is stored
+        """
+        self.window_start = window_start
+        self.max_games = max_games
+        self.max_pages = max_pages
+        self.newest_stored = newest_stored
+        self.end_time = ""
+        self.pages_requested = 0
+        self.games_found = 0
+        self.finished = False
+
+    @staticmethod
+    def parse_time(created_at: str) -> datetime.datetime:
+        """
+        Convert an op.gg time into a datetime
+
+        :param created_at: Op.gg time. e.g. 2024-05-01T12:34:56+09:00
+        :return: Timezone aware datetime
+        """
+        return datetime.datetime.fromisoformat(created_at)
+
+    def has_next_page(self) -> bool:
+        """
+        Check if another page should be requested
+        """
+        return not self.finished and self.pages_requested < self.max_pages
+
+    def next_end_time(self) -> str:
+        """
+        Get the endedAt value for the next page and count it as requested
+
+        :return: Creation time of the last game on the previous page, or an empty string for the newest page
+        """
+        self.pages_requested += 1
+        return self.end_time
+
+    def plan_after_page(self, page_length: int, last_game_created_at: str = None):
+        """
+        Plan the next page from the page just received
+
+        :param page_length: Number of games on the page
+        :param last_game_created_at: Creation time of the oldest game on the page given in the page's meta data
+        """
+        if page_length == 0:
+            self.plan_after_empty_page()
+            return
+
+        self.games_found += page_length
+        if last_game_created_at is None:
+            self.finished = True
+            return
+        last_game = self.parse_time(last_game_created_at)
+        if last_game < self.window_start or self.games_found >= self.max_games:
+            self.finished = True
+        elif self.newest_stored is not None and last_game <= self.newest_stored:
+            self.finished = True
+        else:
+            self.end_time = last_game_created_at
+
+    def plan_after_empty_page(self):
+        """
+        Plan the next page after receiving an empty page. Op.gg only returns recent games without an endedAt, so step
+        back four weeks at a time until the time window has been covered
+        """
+        if self.newest_stored is not None:
+            self.finished = True
+            return
+        if self.end_time == "":
+            previous_end = datetime.datetime.now()
+        else:
+            previous_end = self.parse_time(self.end_time)
+        end_time = (previous_end - datetime.timedelta(weeks=4)).strftime("%Y-%m-%dT00:23:00+09:00")
+        if self.parse_time(end_time) < self.window_start:
+            self.finished = True
+        else:
+            self.end_time = end_time
+
+    def keep_game(self, match: dict) -> bool:
+        """
+        Check if a game from a page belongs in the history
+
+        :param match: Game from the op.gg match history
+        :return: True if the game is in the time window and newer than every stored game
+        """
+        created_at = self.parse_time(match['created_at'])
+        return created_at >= self.window_start and (self.newest_stored is None or created_at > self.newest_stored)
@@ -9,13 +9,15 @@ class PlayerLockedInPosition:
     """
     Handle creating the player locked in positions table
     """
-    def __init__(self, api_results: object):
+    def __init__(self, api_results: object, file_prefix: str = ''):
         """
         Handle creating the player locked in positions table
 
         :param api_results: Results from the api_queries file
+        :param file_prefix: Prefix to add to the image file name
         """
         self.api_results = api_results
+        self.file_prefix = file_prefix
         self.titles = None
         self.columns = []
         self.player_column = []
@@ -39,7 +41,7 @@ class PlayerLockedInPosition:
         """
         Create the image from the processed results
         """
-        CreateImage(self.titles, self.columns, '../extra_files/player_positions.png',
+        CreateImage(self.titles, self.columns, f'{self.file_prefix}player_positions.png',
                     colour=self.colour_columns, convert_columns=True)
 
     def process_every_player(self):
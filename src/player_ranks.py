@@ -9,13 +9,15 @@ class PlayerRanks:
     """
     Handle creating the player ranks table
     """
-    def __init__(self, api_results: object):
+    def __init__(self, api_results: object, file_prefix: str = ''):
         """
         Handle creating the player ranks table
 
         :param api_results: Results from the api_queries file
+        :param file_prefix: Prefix to add to the image file name
         """
         self.api_results = api_results
+        self.file_prefix = file_prefix
         self.titles = None
         self.columns = []
         self.player_column = []
@@ -39,7 +41,7 @@ class PlayerRanks:
         """
         Create the image from the processed results
         """
-        CreateImage(self.titles, self.columns, '../extra_files/player_ranks.png',
+        CreateImage(self.titles, self.columns, f'{self.file_prefix}player_ranks.png',
                     colour=self.colour_columns, convert_columns=True)
 
     def process_every_player(self):
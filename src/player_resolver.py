@@ -0,0 +1,117 @@
+"""
+This file looks up the Riot account of each player and the clash team they are in, and remembers them for a while so a
+scout can be identified by who is being scouted before it is queued
+"""
+
+import asyncio
+import os
+import time
+from urllib.error import HTTPError
+
+from fetch_engine import get_fetch_engine
+from process_shared import shared_instance
+
+
+class PlayerResolver:
+    """
+    Short lived cache of the Riot account of each player name and the clash team of each puuid. Every method runs on the
+    fetch engine's event loop, so the entries are only ever touched from one thread
+    """
+    def __init__(self, ttl: int = None):
+        """
+        Short lived cache of the Riot account of each player name and the clash team of each puuid
+
+        :param ttl: Number of seconds an account or clash team is remembered for
+        """
+        self.ttl = ttl or int(os.getenv('PLAYER_RESOLVER_TTL', 10 * 60))
+        self.fetch_engine = get_fetch_engine()
+        self.base_url = 'https://americas.api.riotgames.com'
+        self.base_url_na1 = 'https://na1.api.riotgames.com'
+        self.accounts = {}
+        self.clash_teams = {}
+
+    def get_cached(self, entries: dict, key: str):
+        """
+        Get an entry which has not expired
+
+        :param entries: Entries to look in
+        :param key: Key of the entry
+        :return: Tuple of if the entry was found and its value
+        """
+        entry = entries.get(key)
+        if entry is None or entry[0] <= time.time():
+            entries.pop(key, None)
+            return False, None
+        return True, entry[1]
+
+    async def get_account(self, player: str, low_priority: bool = False) -> dict:
+        """
+        Get the Riot account of the player. Players without a tag line are looked up in NA1
+
+        :param player: Player name. e.g. Debonairesnake6 or Debonairesnake6#NA1
+        :param low_priority: Leave part of the rate limits for the other requests. e.g. when pre-warming
+        :return: Account information of the player
+        """
+        found, account = self.get_cached(self.accounts, player.lower())
+        if not found:
+            tag_line = "NA1" if "#" not in player else player.split("#")[1]
+            account = await self.fetch_engine.get_json(f'{self.base_url}/riot/account/v1/accounts/by-riot-id/{player}/'
+                                                       f'{tag_line}?api_key={os.getenv("RIOT_API")}', low_priority)
+            self.accounts[player.lower()] = (time.time() + self.ttl, account)
+        return account
+
+    async def get_clash_team_id(self, puuid: str, low_priority: bool = False):
+        """
+        Get the id of the clash team the player is registered in
+
+        :param puuid: Riot puuid of the player
+        :param low_priority: Leave part of the rate limits for the other requests. e.g. when pre-warming
+        :return: Clash team id, or None if the player is not in a clash team
+        """
+        found, team_id = self.get_cached(self.clash_teams, puuid)
+        if not found:
+            clash_team_info = await self.fetch_engine.get_json(f'{self.base_url_na1}/lol/clash/v1/players/by-puuid/'
+                                                               f'{puuid}?api_key={os.getenv("RIOT_API")}', low_priority)
+            team_id = clash_team_info[0]['teamId'] if clash_team_info else None
+            self.clash_teams[puuid] = (time.time() + self.ttl, team_id)
+        return team_id
+
+    async def get_scout_key(self, player_list: list, clash_api: bool) -> tuple:
+        """
+        Get the key identifying identical scouts from who is actually being scouted. Players are identified by their
+        puuid, so different spellings of the same player match, and a clash scout by its team, so any member of the team
+        matches. Players who cannot be found fall back to their lower case name
+
+        :param player_list: Names of the players to scout
+        :param clash_api: If using a single player to leverage the clash API
+        :return: Key of the scout. e.g. ('clash', 'team id') or ('scout', ('puuid1', 'puuid2'))
+        """
+        accounts = await asyncio.gather(*[self.get_account(player.strip()) for player in player_list],
+                                        return_exceptions=True)
+        players = []
+        for account in accounts:
+            if isinstance(account, HTTPError):
+                players.append(None)
+            elif isinstance(account, BaseException):
+                raise account
+            else:
+                players.append(account['puuid'])
+        if clash_api and players and players[0] is not None:
+            try:
+                team_id = await self.get_clash_team_id(players[0])
+            except HTTPError:
+                team_id = None
+            if team_id is not None:
+                return 'clash', team_id
+        players = [puuid or player.strip().lower() for puuid, player in zip(players, player_list)]
+        return 'clash' if clash_api else 'scout', tuple(sorted(set(players)))
+
+
+@shared_instance
+def get_player_resolver() -> PlayerResolver:
+    """
+    Get the player resolver shared by the process
+
+    :return: Shared player resolver
+    """
+    return PlayerResolver()
@@ -0,0 +1,163 @@
+"""
+This file pre-fetches the data for the players scouted in each guild shortly before a clash tournament opens
+"""
+
+import json
+import os
+import threading
+import time
+
+import api_queries
+from fetch_engine import get_fetch_engine
+from process_shared import open_database, shared_instance
+
+
+class PrewarmScheduler:
+    """
+    Background scheduler which remembers the players scouted in each guild and runs their queries at low priority
+    before each clash registration opens, so the commands during lock in mostly hit the caches
+    """
+    def __init__(self, path: str = '../extra_files/prewarm.sqlite', lead_time: int = None, check_interval: int = None,
+                 max_age: int = None, max_entries: int = None):
+        """
+        Background scheduler which remembers the players scouted in each guild
+
+        :param path: Location of the SQLite database
+        :param lead_time: Number of seconds before registration opens to start pre-warming
+        :param check_interval: Number of seconds between each check of the clash schedule
+        :param max_age: Number of seconds a scouted player stays on the watch list
+        :param max_entries: Maximum number of scouts to pre-warm before each tournament, newest first
+        """
+        self.path = path
+        self.lead_time = lead_time or int(os.getenv('PREWARM_LEAD_TIME', 3 * 60 * 60))
+        self.check_interval = check_interval or int(os.getenv('PREWARM_CHECK_INTERVAL', 15 * 60))
+        self.max_age = max_age or int(os.getenv('PREWARM_WATCH_MAX_AGE', 14 * 24 * 60 * 60))
+        self.max_entries = max_entries or int(os.getenv('PREWARM_MAX_ENTRIES', 50))
+        self.fetch_engine = get_fetch_engine()
+        self.lock = threading.Lock()
+        self.stop_event = threading.Event()
+        self.prewarm_thread = None
+
+        self.connection = open_database(self.path)
+        self.connection.execute('CREATE TABLE IF NOT EXISTS watch_list (guild_id INTEGER NOT NULL, players TEXT NOT '
+                                'NULL, clash_api INTEGER NOT NULL, scouted_at REAL NOT NULL, '
+                                'PRIMARY KEY (guild_id, players, clash_api))')
+        self.connection.execute('CREATE TABLE IF NOT EXISTS prewarmed (phase_id INTEGER PRIMARY KEY, '
+                                'prewarmed_at REAL NOT NULL)')
+        self.connection.commit()
+
+    def start(self):
+        """
+        Start checking the clash schedule in the background
+        """
+        if self.prewarm_thread is None:
+            self.prewarm_thread = threading.Thread(target=self.check_periodically, name='prewarm', daemon=True)
+            self.prewarm_thread.start()
+
+    def stop(self):
+        """
+        Stop checking the clash schedule
+        """
+        self.stop_event.set()
+
+    def watch(self, guild_id: int, player_list: list, clash_api: bool):
+        """
+        Add a scout to the watch list, or move it to the front if it is already on it
+
+        :param guild_id: Id of the guild the scout was run in, or 0 for a direct message
+        :param player_list: Names of the players scouted
+        :param clash_api: If the scout used the clash API with a single player
+        """
+        players = json.dumps(sorted(player.strip() for player in player_list))
+        with self.lock:
+            self.connection.execute('INSERT OR REPLACE INTO watch_list (guild_id, players, clash_api, scouted_at) '
+                                    'VALUES (?, ?, ?, ?)', (guild_id, players, int(clash_api), time.time()))
+            self.connection.commit()
+
+    def get_watch_list(self) -> list:
+        """
+        Get the scouts to pre-warm, removing the ones not run within the maximum age
+
+        :return: Each scout as a tuple of the player list and if it used the clash API, newest first
+        """
+        with self.lock:
+            self.connection.execute('DELETE FROM watch_list WHERE scouted_at <= ?', (time.time() - self.max_age,))
+            self.connection.commit()
+            rows = self.connection.execute('SELECT players, clash_api FROM watch_list GROUP BY players, clash_api '
+                                           'ORDER BY MAX(scouted_at) DESC LIMIT ?', (self.max_entries,)).fetchall()
+        return [(json.loads(players), bool(clash_api)) for players, clash_api in rows]
+
+    def check_periodically(self):
+        """
+        Check the clash schedule straight away and then once every check interval
+        """
+        while True:
+            try:
+                self.check_schedule()
+            except Exception as exception:
+                print(f'Failed to check the clash schedule: {exception}')
+            if self.stop_event.wait(self.check_interval):
+                break
+
+    def check_schedule(self):
+        """
+        Pre-warm the watch list once for each tournament phase whose registration opens within the lead time
+        """
+        tournaments = self.fetch_engine.run(self.fetch_engine.get_json(
+            f'https://na1.api.riotgames.com/lol/clash/v1/tournaments?api_key={os.getenv("RIOT_API")}',
+            low_priority=True))
+        now = time.time()
+        for tournament in tournaments:
+            for phase in tournament['schedule']:
+                registration_time = phase['registrationTime'] / 1000
+                if phase['cancelled'] or not registration_time - self.lead_time <= now < registration_time:
+                    continue
+                if not self.is_prewarmed(phase['id']):
+                    self.prewarm()
+                    self.set_prewarmed(phase['id'])
+
+    def is_prewarmed(self, phase_id: int) -> bool:
+        """
+        Check if the watch list was already pre-warmed for the tournament phase
+
+        :param phase_id: Id of the tournament phase
+        """
+        with self.lock:
+            return self.connection.execute('SELECT 1 FROM prewarmed WHERE phase_id = ?', (phase_id,)).fetchone() \
+                is not None
+
+    def set_prewarmed(self, phase_id: int):
+        """
+        Save that the watch list was pre-warmed for the tournament phase
+
+        :param phase_id: Id of the tournament phase
+        """
+        with self.lock:
+            self.connection.execute('INSERT OR REPLACE INTO prewarmed (phase_id, prewarmed_at) VALUES (?, ?)',
+                                    (phase_id, time.time()))
+            self.connection.commit()
+
+    def prewarm(self):
+        """
+        Run the queries for every scout on the watch list at low priority. The results are thrown away, the point is
+        to fill the op.gg page cache and the match history store
+        """
+        watch_list = self.get_watch_list()
+        print(f'Pre-warming {len(watch_list)} scouts')
+        for player_list, clash_api in watch_list:
+            if self.stop_event.is_set():
+                return
+            try:
+                api_queries.APIQueries(player_list, clash_api, low_priority=True)
+            except Exception as exception:
+                print(f'Failed to pre-warm {", ".join(player_list)}: {exception}')
+
+
+@shared_instance
+def get_prewarm_scheduler() -> PrewarmScheduler:
+    """
+    Get the pre-warm scheduler shared by the process
+
+    :return: Shared pre-warm scheduler
+    """
+    return PrewarmScheduler()
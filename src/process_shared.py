@@ -0,0 +1,56 @@
+"""
+This file holds the helpers for everything shared by the whole process: the SQLite databases kept in extra_files and the
+objects created once and then used by every command
+"""
+
+import functools
+import os
+import sqlite3
+import threading
+
+
+def create_parent_directory(path: str):
+    """
+    Create the directory a file is saved in if it does not exist yet
+
+    :param path: Location of the file. e.g. ../extra_files/op_gg_cache.sqlite
+    """
+    if not os.path.isdir(os.path.dirname(path)):
+        os.mkdir(os.path.dirname(path))
+
+
+def open_database(path: str) -> sqlite3.Connection:
+    """
+    Open a SQLite database shared by every thread in the process. The callers guard the connection with their own lock.
+    Commits only need to reach the write ahead log rather than syncing the whole database, as every database holds data
+    which can be fetched again
+
+    :param path: Location of the SQLite database
+    :return: Connection to the database
+    """
+    create_parent_directory(path)
+    connection = sqlite3.connect(path, check_same_thread=False)
+    connection.execute('PRAGMA journal_mode=WAL')
+    connection.execute('PRAGMA synchronous=NORMAL')
+    return connection
+
+
+def shared_instance(create):
+    """
+    Turn a function creating an object into one returning the same object to every caller in the process. The object
+    is created the first time it is asked for, once for each set of arguments
+
+    :param create: Function creating the object
+    :return: Function returning the shared object
+    """
+    lock = threading.Lock()
+    instances = {}
+
+    @functools.wraps(create)
+    def get_instance(*args, **kwargs):
+        key = args, tuple(sorted(kwargs.items()))
+        with lock:
+            if key not in instances:
+                instances[key] = create(*args, **kwargs)
+        return instances[key]
+    return get_instance
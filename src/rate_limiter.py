@@ -0,0 +1,360 @@
+"""
+This file schedules requests to the Riot API so they stay within the rate limits given back in the response headers
+"""
+
+import asyncio
+import os
+import time
+from collections import deque
+from urllib.parse import urlsplit
+
+
+class RateLimitBucket:
+    """
+    Token bucket for a single Riot limit of a number of requests over a number of seconds. A token is spent for every
+    request and returned once the request has left the window, so the limit can never be exceeded in any window
+    """
+    def __init__(self, limit: int, seconds: int):
+        """
+        Token bucket for a single Riot limit of a number of requests over a number of seconds
+
+        :param limit: Number of requests allowed in the window
+        :param seconds: Length of the window in seconds
+        """
+        self.limit = limit
+        self.seconds = seconds
+        self.spent = deque()
+
+        # Extra time to hold each token for to cover the clock difference between us and the Riot servers
+        self.margin = 0.1
+
+    def release_expired(self, now: float):
+        """
+        Return the tokens for every request which has left the window
+
+        :param now: Current monotonic time
+        """
+        while self.spent and self.spent[0] + self.seconds + self.margin <= now:
+            self.spent.popleft()
+
+    def remaining(self, now: float) -> int:
+        """
+        Get the number of tokens left in the bucket
+
+        :param now: Current monotonic time
+        :return: Number of requests which may be sent right now
+        """
+        self.release_expired(now)
+        return self.limit - len(self.spent)
+
+    def wait_time(self, now: float, reserve: int = 0) -> float:
+        """
+        Get the time until a token is available
+
+        :param now: Current monotonic time
+        :param reserve: Number of tokens which must be left in the bucket after this one is spent
+        :return: Seconds to wait before a request may be sent
+        """
+        if self.remaining(now) > reserve:
+            return 0.0
+        return self.spent[len(self.spent) - self.limit + reserve] + self.seconds + self.margin - now
+
+    def spend(self, now: float):
+        """
+        Spend a token for a request about to be sent
+
+        :param now: Current monotonic time
+        """
+        self.spent.append(now)
+
+    def sync_count(self, count: int, now: float):
+        """
+        Spend extra tokens if the Riot servers have counted more requests than we have. e.g. after a restart
+
+        :param count: Number of requests Riot has counted in the current window
+        :param now: Current monotonic time
+        """
+        self.release_expired(now)
+        for _ in range(count - len(self.spent)):
+            self.spend(now)
+
+
+class RateLimit:
+    """
+    Every bucket for one of the Riot rate limits along with any Retry-After block
+    """
+    def __init__(self, limits: str = None):
+        """
+        Every bucket for one of the Riot rate limits along with any Retry-After block
+
+        :param limits: Limits in the format of the rate limit headers. e.g. 20:1,100:120
+        """
+        self.buckets = []
+        self.blocked_until = 0.0
+        if limits:
+            self.set_limits(limits)
+
+    @property
+    def known(self) -> bool:
+        """
+        If the limits have been read from a response yet
+        """
+        return len(self.buckets) > 0
+
+    def set_limits(self, limits: str):
+        """
+        Update the buckets to match the limits given by Riot, keeping the tokens already spent
+
+        :param limits: Limits in the format of the rate limit headers. e.g. 20:1,100:120
+        """
+        current = {bucket.seconds: bucket for bucket in self.buckets}
+        self.buckets = []
+        for limit in limits.split(','):
+            requests, seconds = [int(value) for value in limit.split(':')]
+            bucket = current.get(seconds, RateLimitBucket(requests, seconds))
+            bucket.limit = requests
+            self.buckets.append(bucket)
+
+    def sync_counts(self, counts: str, now: float):
+        """
+        Spend extra tokens to match the counts given by Riot
+
+        :param counts: Counts in the format of the rate limit count headers. e.g. 1:1,1:120
+        :param now: Current monotonic time
+        """
+        for count in counts.split(','):
+            requests, seconds = [int(value) for value in count.split(':')]
+            for bucket in self.buckets:
+                if bucket.seconds == seconds:
+                    bucket.sync_count(requests, now)
+
+    def remaining(self, now: float) -> int:
+        """
+        Get the number of requests allowed right now by the tightest bucket
+
+        :param now: Current monotonic time
+        :return: Number of requests which may be sent right now
+        """
+        if now < self.blocked_until:
+            return 0
+        return min([bucket.remaining(now) for bucket in self.buckets], default=0)
+
+    def wait_time(self, now: float, reserve: float = 0.0) -> float:
+        """
+        Get the time until every bucket allows another request
+
+        :param now: Current monotonic time
+        :param reserve: Fraction of each bucket which must be left after the request. e.g. 0.5 to only use the first
+                        half of every bucket
+        :return: Seconds to wait before a request may be sent
+        """
+        # At least one token of every bucket stays usable, even with a reserve of 1.0 or on very small buckets
+        return max([self.blocked_until - now] + [bucket.wait_time(now, min(max(int(bucket.limit * reserve), 0),
+                                                                          bucket.limit - 1))
+                                                 for bucket in self.buckets])
+
+    def spend(self, now: float):
+        """
+        Spend a token from every bucket
+
+        :param now: Current monotonic time
+        """
+        for bucket in self.buckets:
+            bucket.spend(now)
+
+
+class RiotRateLimiter:
+    """
+    Shared limiter keeping separate application budgets for each routing host and method budgets for each endpoint
+    """
+    def __init__(self, default_app_limits: str = None):
+        """
+        Shared limiter keeping separate application budgets for each routing host and method budgets for each endpoint
+
+        :param default_app_limits: Application limits to use for a host before Riot has told us the real ones
+        """
+        self.default_app_limits = default_app_limits or os.getenv('RIOT_APP_RATE_LIMIT', '20:1,100:120')
+
+        # Low priority requests such as pre-warming leave this fraction of every bucket for the commands
+        self.low_priority_reserve = float(os.getenv('RIOT_LOW_PRIORITY_RESERVE', 0.5))
+        self.app_limits = {}
+        self.method_limits = {}
+        self.host_blocks = {}
+
+        # Methods with unknown limits only send a single request until the first response tells us the limits
+        self.probing_methods = set()
+
+    @staticmethod
+    def is_riot_url(url: str) -> bool:
+        """
+        Check if the url is rate limited by Riot
+
+        :param url: Url about to be requested
+        """
+        return urlsplit(url).netloc.endswith('.api.riotgames.com')
+
+    @staticmethod
+    def get_host(url: str) -> str:
+        """
+        Get the routing host of the url. e.g. americas, na1
+
+        :param url: Url about to be requested
+        :return: Routing host
+        """
+        return urlsplit(url).netloc.split('.')[0]
+
+    @staticmethod
+    def get_method(url: str) -> str:
+        """
+        Get the Riot method of the url by removing the path parameters. The method ends at the first by-* segment, or
+        after the first four segments when there is none. e.g. /lol/clash/v1/teams/{teamId} -> lol/clash/v1/teams
+
+        :param url: Url about to be requested
+        :return: Name of the method
+        """
+        segments = urlsplit(url).path.strip('/').split('/')
+        for cnt, segment in enumerate(segments):
+            if segment.startswith('by-'):
+                return '/'.join(segments[:cnt + 1])
+        return '/'.join(segments[:4])
+
+    def get_app_limit(self, host: str) -> RateLimit:
+        """
+        Get the application limit for the given host
+
+        :param host: Routing host
+        """
+        if host not in self.app_limits:
+            self.app_limits[host] = RateLimit(self.default_app_limits)
+        return self.app_limits[host]
+
+    def get_method_limit(self, host: str, method: str) -> RateLimit:
+        """
+        Get the method limit for the given host and method
+
+        :param host: Routing host
+        :param method: Name of the method
+        """
+        if (host, method) not in self.method_limits:
+            self.method_limits[(host, method)] = RateLimit()
+        return self.method_limits[(host, method)]
+
+    async def acquire(self, url: str, low_priority: bool = False):
+        """
+        Wait until the url may be requested without going over any rate limit and spend the tokens for it
+
+        :param url: Url about to be requested
+        :param low_priority: Only spend from the part of each bucket not kept in reserve for the commands
+        """
+        host = self.get_host(url)
+        if not self.is_riot_url(url):
+            await asyncio.sleep(max(self.host_blocks.get(host, 0.0) - time.monotonic(), 0))
+            return
+
+        method = self.get_method(url)
+        app_limit = self.get_app_limit(host)
+        method_limit = self.get_method_limit(host, method)
+        reserve = self.low_priority_reserve if low_priority else 0.0
+        while True:
+            now = time.monotonic()
+            if not method_limit.known and (host, method) in self.probing_methods:
+                wait = 0.05
+            else:
+                wait = max(app_limit.wait_time(now, reserve), method_limit.wait_time(now, reserve))
+            if wait <= 0:
+                break
+            await asyncio.sleep(wait)
+
+        now = time.monotonic()
+        app_limit.spend(now)
+        method_limit.spend(now)
+        if not method_limit.known:
+            self.probing_methods.add((host, method))
+
+    def update(self, url: str, status: int, headers: dict):
+        """
+        Update the limits and counts from the response headers of a request
+
+        :param url: Url which was requested
+        :param status: Status code of the response
+        :param headers: Headers of the response
+        """
+        host = self.get_host(url)
+        now = time.monotonic()
+        retry_after = self.get_retry_after(headers) if status == 429 else 0.0
+
+        if not self.is_riot_url(url):
+            if retry_after:
+                self.host_blocks[host] = now + retry_after
+            return
+
+        method = self.get_method(url)
+        app_limit = self.get_app_limit(host)
+        method_limit = self.get_method_limit(host, method)
+        self.probing_methods.discard((host, method))
+        if 'X-App-Rate-Limit' in headers:
+            app_limit.set_limits(headers['X-App-Rate-Limit'])
+        if 'X-App-Rate-Limit-Count' in headers:
+            app_limit.sync_counts(headers['X-App-Rate-Limit-Count'], now)
+        if 'X-Method-Rate-Limit' in headers:
+            method_limit.set_limits(headers['X-Method-Rate-Limit'])
+        if 'X-Method-Rate-Limit-Count' in headers:
+            method_limit.sync_counts(headers['X-Method-Rate-Limit-Count'], now)
+
+        # Block whichever limit was hit until Riot says we may continue
+        if retry_after:
+            if headers.get('X-Rate-Limit-Type') == 'method':
+                method_limit.blocked_until = now + retry_after
+            else:
+                app_limit.blocked_until = now + retry_after
+
+    def cancel(self, url: str):
+        """
+        Stop probing the method of a request which failed before a response was received
+
+        :param url: Url which was requested
+        """
+        self.probing_methods.discard((self.get_host(url), self.get_method(url)))
+
+    @staticmethod
+    def get_retry_after(headers: dict) -> float:
+        """
+        Get the number of seconds to wait from the Retry-After header, waiting a second if Riot did not give one
+
+        :param headers: Headers of a 429 response
+        :return: Seconds to wait before retrying
+        """
+        try:
+            return max(float(headers.get('Retry-After', 1)), 0.0)
+        except ValueError:
+            return 1.0
+
+    def remaining_budget(self, host: str, method: str = None) -> int:
+        """
+        Get the number of requests which may be sent right now
+
+        :param host: Routing host. e.g. americas, na1
+        :param method: Name of the method, or None for only the application limit
+        :return: Number of requests left in the tightest bucket
+        """
+        now = time.monotonic()
+        remaining = self.get_app_limit(host).remaining(now)
+        if method is not None and (host, method) in self.method_limits and self.method_limits[(host, method)].known:
+            remaining = min(remaining, self.method_limits[(host, method)].remaining(now))
+        return remaining
+
+    def budget_summary(self) -> dict:
+        """
+        Get the remaining budget of every limit seen so far. Releases expired tokens, so it must be called on the event
+        loop which acquires them
+
+        :return: Dictionary of each host with its application budget and the budget of each method
+        """
+        summary = {}
+        for host in self.app_limits:
+            summary[host] = {'application': self.remaining_budget(host), 'methods': {}}
+        for host, method in self.method_limits:
+            if self.method_limits[(host, method)].known:
+                summary.setdefault(host, {'application': self.remaining_budget(host), 'methods': {}})
+                summary[host]['methods'][method] = self.remaining_budget(host, method)
+        return summary
@@ -22,15 +22,17 @@ class RecentChampion:
     """
     Handle creating the recent champion table
     """
-    def __init__(self, api_results: 'APIQueries', table_type: str, title_colours: list):
+    def __init__(self, api_results: 'APIQueries', table_type: str, title_colours: list, file_prefix: str = ''):
         """
         Handle creating the recent champion table
 
         :param api_results: Results from the api_queries file
         :param table_type: Type of table to create: ranked_match_ranked, all_match_history
         :param title_colours: What to colour each title based ont eh player's rank
+        :param file_prefix: Prefix to add to the image file name
         """
         self.api_results = api_results
+        self.file_prefix = file_prefix
         self.title_colours = title_colours[:]
         self.titles = None
         self.columns = []
@@ -40,7 +42,7 @@ class RecentChampion:
         self.colour_current_column = []
         self.match_history = None
         self.current_match = None
-        self.champion_info = self.api_results.champion_info
+        self.champion_registry = self.api_results.champion_registry
         self.champions_played = {}
         self.champion = None
         self.player_cnt = None
@@ -71,7 +73,7 @@ class RecentChampion:
         """
         Create the image from the processed results
         """
-        CreateImage(self.titles, self.columns, f'../extra_files/{self.table_type}.png',
+        CreateImage(self.titles, self.columns, f'{self.file_prefix}{self.table_type}.png',
                     colour=self.colour_columns, convert_columns=True, title_colours=self.title_colours)
 
     def create_recent_champion_table(self):
@@ -213,6 +215,6 @@ class RecentChampion:
         """
         Determine the champion played int he current game
         """
-        for champion_name in self.champion_info:
-            if str(self.current_match['champion']) == self.champion_info[champion_name]['name']:
-                self.champions_played[champion_name] = self.champions_played.get(champion_name, 0) + 1
+        champion_name = self.champion_registry.get_id_by_name(self.current_match['champion'])
+        if champion_name is not None:
+            self.champions_played[champion_name] = self.champions_played.get(champion_name, 0) + 1
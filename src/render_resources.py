@@ -0,0 +1,98 @@
+"""
+This file loads everything the tables are drawn with once per process and keeps blank canvases to draw the tables on
+"""
+
+import os
+import threading
+from collections import OrderedDict
+
+from PIL import Image
+
+from glyph_atlas import GlyphAtlas, get_glyph_atlas
+from process_shared import shared_instance
+
+
+class RenderResources:
+    """
+    Font, colours and blank canvases shared by every table drawn in the process. The scouts create tables of the same
+    few shapes over and over, so a blank canvas of each size is kept and copied instead of being allocated and filled
+    """
+    def __init__(self, font_path: str = '../extra_files/cour.ttf', size: int = 20, max_canvases: int = None):
+        """
+        Font, colours and blank canvases shared by every table drawn in the process
+
+        :param font_path: Location of the monospaced font
+        :param size: Size of the font in pixels
+        :param max_canvases: Number of canvas sizes to keep
+        """
+        self.atlas: GlyphAtlas = get_glyph_atlas(font_path, size)
+        self.max_canvases = max_canvases or int(os.getenv('RENDER_CANVAS_CACHE_SIZE', 64))
+        self.background = (36, 36, 41)
+        self.margin = 12
+        self.colours = {
+            '': (255, 255, 255),
+            'red': (255, 0, 0),
+            'orange': (255, 106, 0),
+            'yellow': (255, 255, 0),
+            'blue': (50, 150, 255),
+            'green': (0, 153, 51),
+            'iron': (91, 82, 83),
+            'bronze': (136, 75, 48),
+            'silver': (134, 158, 166),
+            'gold': (201, 136, 52),
+            'platinum': (62, 121, 120),
+            'emerald': (2, 151, 57),
+            'diamond': (131, 184, 215),
+            'master': (146, 100, 182),
+            'grandmaster': (214, 51, 46),
+            'challenger': (255, 154, 43),
+            'black': (0, 0, 0),
+            'unranked': (255, 255, 255)
+        }
+        self.canvases = OrderedDict()
+        self.lock = threading.Lock()
+
+    def get_canvas_size(self, line_width: int, line_count: int) -> tuple:
+        """
+        Get the size of the image for a table
+
+        :param line_width: Number of characters in each line of the table
+        :param line_count: Number of lines in the table
+        :return: Width and height of the image in pixels
+        """
+        return (line_width * self.atlas.advance) + self.margin * 2, \
+            (line_count - 1) * self.atlas.line_height + self.margin * 4
+
+    def get_canvas(self, line_width: int, line_count: int) -> tuple:
+        """
+        Get a blank canvas for a table, copied from the one kept for its size
+
+        :param line_width: Number of characters in each line of the table
+        :param line_count: Number of lines in the table
+        :return: Canvas filled with the background colour which the caller is free to draw on, and if a canvas of its
+                 size was already kept
+        """
+        size = self.get_canvas_size(line_width, line_count)
+        with self.lock:
+            canvas = self.canvases.get(size)
+            if canvas is not None:
+                self.canvases.move_to_end(size)
+        if canvas is not None:
+            return canvas.copy(), True
+
+        canvas = Image.new('RGB', size, color=self.background)
+        with self.lock:
+            self.canvases[size] = canvas
+            while len(self.canvases) > self.max_canvases:
+                self.canvases.popitem(last=False)
+        return canvas.copy(), False
+
+
+@shared_instance
+def get_render_resources() -> RenderResources:
+    """
+    Get the render resources shared by the process
+
+    :return: Shared render resources
+    """
+    return RenderResources()
@@ -0,0 +1,83 @@
+"""
+This file draws the tables in a pool of processes so several tables can be drawn at the same time on separate cores
+"""
+
+import io
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+
+import text_to_image
+from metrics import get_metrics
+from process_shared import shared_instance
+from table_grid import TableGrid
+
+
+def render_table(grid: TableGrid) -> tuple:
+    """
+    Draw a table and encode it as a PNG. Runs inside the render processes, each of which loads its own font and
+    canvases the first time it draws a table
+
+    :param grid: Titles, rows, colours and column widths of the table
+    :return: Encoded PNG of the table, and if the render process already had a canvas of its size
+    """
+    buffer = io.BytesIO()
+    table_to_image = text_to_image.TableToImage(grid)
+    table_to_image.img.save(buffer, format='PNG')
+    return buffer.getvalue(), table_to_image.canvas_cached
+
+
+class RenderService:
+    """
+    Pool of processes drawing the tables. Drawing is CPU bound and holds the GIL, so the tables of a scout created at
+    the same time on the worker threads only draw in parallel once they are handed to separate processes
+    """
+    def __init__(self, workers: int = None):
+        """
+        Pool of processes drawing the tables
+
+        :param workers: Number of processes, 0 to draw on the calling thread instead
+        """
+        self.workers = int(os.getenv('RENDER_WORKERS', os.cpu_count() or 1)) if workers is None else workers
+        self.pool = None
+        self.lock = threading.Lock()
+
+    def get_pool(self) -> ProcessPoolExecutor:
+        """
+        Get the process pool, starting it the first time a table is drawn. The processes are spawned rather than forked
+        as the bot already has several threads running
+
+        :return: Process pool
+        """
+        with self.lock:
+            if self.pool is None:
+                self.pool = ProcessPoolExecutor(max_workers=self.workers,
+                                                mp_context=multiprocessing.get_context('spawn'))
+        return self.pool
+
+    def render(self, grid: TableGrid) -> bytes:
+        """
+        Draw a table in one of the render processes and wait for it. Blocks, so it is called from the worker threads
+
+        :param grid: Titles, rows, colours and column widths of the table
+        :return: Encoded PNG of the table
+        """
+        if self.workers == 0:
+            image, canvas_cached = render_table(grid)
+        else:
+            image, canvas_cached = self.get_pool().submit(render_table, grid).result()
+
+        # The render processes have their own metrics, so the canvas cache is counted here where it is served
+        get_metrics().increment('render_canvas_requests_total', {'result': 'hit' if canvas_cached else 'miss'})
+        return image
+
+
+@shared_instance
+def get_render_service() -> RenderService:
+    """
+    Get the render service shared by the process
+
+    :return: Shared render service
+    """
+    return RenderService()
@@ -15,17 +15,20 @@ class RoleRate:
     """
     Handle creating the roll rate table
     """
-    def __init__(self, api_results: 'APIQueries' = None, title_colours: list = None, just_using_functions: bool = False):
+    def __init__(self, api_results: 'APIQueries' = None, title_colours: list = None, just_using_functions: bool = False,
+                 file_prefix: str = ''):
         """
         Handle creating the role rate table
 
         :param api_results: Results from the api_queries file
         :param title_colours: What to colour each title based ont eh player's rank
         :param just_using_functions: If the intention is to use functions rather than create an image
+        :param file_prefix: Prefix to add to the image file name
         """
         if title_colours is None:
             title_colours = []
         self.api_results = api_results
+        self.file_prefix = file_prefix
         self.title_colours = title_colours[:]
         self.titles = None
         self.columns = []
@@ -76,7 +79,7 @@ class RoleRate:
         """
         Create the image from the processed results
         """
-        CreateImage(self.titles, self.columns, '../extra_files/roll_rate.png',
+        CreateImage(self.titles, self.columns, f'{self.file_prefix}roll_rate.png',
                     colour=self.colour_columns, convert_columns=True, title_colours=self.title_colours)
 
     def create_roll_rate_table(self):
@@ -199,10 +202,7 @@ class RoleRate:
         """
         Add the champion to the list if played in the same role the player locked in
         """
-        for champion_name in self.api_results.champion_info:
-            if self.current_match['champion'] == self.api_results.champion_info[champion_name]['name']:
-                self.api_results.player_information[self.player_name]['position_champions'][champion_name] = \
-                    self.api_results.player_information[self.player_name]['position_champions'].get(champion_name, 0) + 1
-                break
-        else:
-            print()
+        champion_name = self.api_results.champion_registry.get_id_by_name(self.current_match['champion'])
+        if champion_name is not None:
+            self.api_results.player_information[self.player_name]['position_champions'][champion_name] = \
+                self.api_results.player_information[self.player_name]['position_champions'].get(champion_name, 0) + 1
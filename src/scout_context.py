@@ -0,0 +1,40 @@
+"""
+This file holds the state of a single scouting command so several commands can be processed at the same time
+"""
+
+
+class ScoutContext:
+    """
+    Everything belonging to one command: where it came from, the players being scouted, the results of the queries,
+    the tables created from them and the messages posted in response
+    """
+    image_prefix = 'tables/'
+
+    def __init__(self, message: object):
+        """
+        Everything belonging to one command
+
+        :param message: Discord message or interaction that started the command
+        """
+        self.message = message
+        self.channel = message.channel
+        self.guild_id = message.guild.id if message.guild is not None else 0
+        self.player_list = []
+        self.message_list = []
+        self.api_info = None
+        self.roll_rate = None
+        self.mastery_shared = None
+        self.recent_champion = None
+        self.clash_ranked = None
+        self.player_ranks = None
+        self.champions_for_role = None
+        self.pending_embeds = {}
+
+        # Identical commands sharing the results of this one, and everything posted so far for the ones that join late
+        self.followers = []
+        self.posts = []
+
+        # Images are named after the command so scouts running at the same time, even in the same channel, never
+        # overwrite each other and the cached posts of a clash team keep pointing at the images created for them. They
+        # are kept under a single prefix which AWS expires, as they are never overwritten
+        self.file_prefix = f'{self.image_prefix}{message.id}_'
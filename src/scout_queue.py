@@ -0,0 +1,128 @@
+"""
+This file queues the scouting commands so only a few run at once and identical commands share a single scout
+"""
+
+import asyncio
+import os
+import time
+
+from fetch_engine import get_fetch_engine
+from metrics import get_metrics
+from player_resolver import get_player_resolver
+from scout_context import ScoutContext
+
+
+class ScoutJob:
+    """
+    A single scout waiting in the queue or being processed along with the commands waiting on its result
+    """
+    def __init__(self, key: tuple, context: ScoutContext, clash_api: bool):
+        """
+        A single scout waiting in the queue or being processed
+
+        :param key: Key identifying identical scouts. e.g. ('scout', ('player1', 'player2'))
+        :param context: State of the command that created the job
+        :param clash_api: If using a single player to leverage the clash API
+        """
+        self.key = key
+        self.context = context
+        self.clash_api = clash_api
+        self.done = asyncio.get_running_loop().create_future()
+        self.queued_at = time.perf_counter()
+
+
+class ScoutQueue:
+    """
+    Bounded queue of scouts processed by a fixed number of workers. A command scouting the same players or clash team as
+    a scout already queued or running joins that scout and receives a copy of everything it posts instead of running again
+    """
+    def __init__(self, discord_bot: object, workers: int = None, max_size: int = None):
+        """
+        Bounded queue of scouts processed by a fixed number of workers
+
+        :param discord_bot: Discord bot to run the scouts and post the results with
+        :param workers: Number of scouts processed at the same time
+        :param max_size: Number of scouts that can wait in the queue before new commands are turned away
+        """
+        self.discord_bot = discord_bot
+        self.workers = workers or int(os.getenv('SCOUT_QUEUE_WORKERS', 2))
+        self.max_size = max_size or int(os.getenv('SCOUT_QUEUE_SIZE', 10))
+        self.queue = None
+        self.worker_tasks = []
+        self.in_flight = {}
+        self.busy_workers = 0
+        self.fetch_engine = get_fetch_engine()
+        self.player_resolver = get_player_resolver()
+        self.metrics = get_metrics()
+        self.metrics.add_gauge('scout_queue_depth', lambda: [({}, self.queue.qsize() if self.queue else 0)])
+        self.metrics.add_gauge('scout_queue_busy_workers', lambda: [({}, self.busy_workers)])
+
+    async def get_key(self, player_list: list, clash_api: bool) -> tuple:
+        """
+        Get the key identifying identical scouts from the puuid of each player, or the team for a clash scout. The
+        lookups are cached and used again by the scout itself. If Riot cannot be reached the names are used instead
+
+        :param player_list: Names of the players to scout
+        :param clash_api: If using a single player to leverage the clash API
+        :return: Key of the scout
+        """
+        try:
+            return await self.fetch_engine.run_async(self.player_resolver.get_scout_key(player_list, clash_api))
+        except Exception as exception:
+            print(f'Failed to identify the scout: {exception}')
+            players = tuple(sorted({player.strip().lower() for player in player_list}))
+            return 'clash' if clash_api else 'scout', players
+
+    def start(self):
+        """
+        Create the queue and start the workers on the running event loop
+        """
+        if self.queue is None:
+            self.queue = asyncio.Queue(maxsize=self.max_size)
+            self.worker_tasks = [asyncio.create_task(self.work()) for _ in range(self.workers)]
+
+    async def submit(self, context: ScoutContext, clash_api: bool = False):
+        """
+        Add the scout for the command to the queue, or join the identical scout already in flight, and wait for it
+        to finish
+
+        :param context: State of the command being processed
+        :param clash_api: If using a single player to leverage the clash API
+        """
+        self.start()
+        key = await self.get_key(context.player_list, clash_api)
+        if key in self.in_flight:
+            job = self.in_flight[key]
+            self.metrics.increment('scout_queue_joined_total')
+            await self.discord_bot.add_follower(job.context, context)
+        else:
+            if self.queue.full():
+                await self.discord_bot.send(context, 'Too many scouts are already waiting. Please try again in a few '
+                                                     'minutes.', share=False)
+                return
+            jobs_ahead = self.queue.qsize()
+            job = ScoutJob(key, context, clash_api)
+            self.in_flight[key] = job
+            self.queue.put_nowait(job)
+            if self.busy_workers + jobs_ahead >= self.workers:
+                await self.discord_bot.send(context, f'Your scout is number {jobs_ahead + 1} in the queue.', share=False)
+        await asyncio.shield(job.done)
+
+    async def work(self):
+        """
+        Process the scouts in the queue one at a time
+        """
+        while True:
+            job = await self.queue.get()
+            self.metrics.observe('scout_queue_wait_seconds', time.perf_counter() - job.queued_at)
+            self.busy_workers += 1
+            try:
+                await self.discord_bot.run_scout(job.context, job.clash_api)
+            except Exception as exception:
+                job.done.set_exception(exception)
+            else:
+                job.done.set_result(None)
+            finally:
+                self.in_flight.pop(job.key, None)
+                self.busy_workers -= 1
+                self.queue.task_done()
@@ -0,0 +1,76 @@
+"""
+This file keeps the finished tables of each clash team so repeated scouts of the same team are answered straight away
+"""
+
+import os
+import threading
+import time
+
+from metrics import get_metrics
+from process_shared import shared_instance
+
+
+class ScoutResultCache:
+    """
+    In memory cache of everything posted for a clash team, keyed by the team id. An entry is only used while the team
+    has the same roster and its time to live has not passed
+    """
+    def __init__(self, ttl: int = None):
+        """
+        In memory cache of everything posted for a clash team
+
+        :param ttl: Number of seconds an entry stays valid for
+        """
+        self.ttl = ttl or int(os.getenv('SCOUT_RESULT_TTL', 60 * 60))
+        self.entries = {}
+        self.lock = threading.Lock()
+
+    @staticmethod
+    def get_roster(clash_team_members: list) -> frozenset:
+        """
+        Get the roster of a clash team in a form that can be compared
+
+        :param clash_team_members: Players from the clash teams API
+        :return: Set of the puuid and position of each player
+        """
+        return frozenset((member['puuid'], member['position']) for member in clash_team_members)
+
+    def get(self, team_id: str, roster: frozenset):
+        """
+        Get the posts saved for the team
+
+        :param team_id: Clash team id
+        :param roster: Current roster of the team
+        :return: Each post as keyword arguments for DiscordBot.send, or None if nothing valid is saved
+        """
+        with self.lock:
+            entry = self.entries.get(team_id)
+            if entry is not None and (entry['roster'] != roster or entry['expires_at'] <= time.time()):
+                self.entries.pop(team_id)
+                entry = None
+        get_metrics().increment('scout_result_cache_requests_total', {'result': 'miss' if entry is None else 'hit'})
+        return None if entry is None else entry['posts']
+
+    def set(self, team_id: str, roster: frozenset, posts: list):
+        """
+        Save the posts for the team and remove any expired entries
+
+        :param team_id: Clash team id
+        :param roster: Roster of the team the posts were created for
+        :param posts: Each post as keyword arguments for DiscordBot.send
+        """
+        now = time.time()
+        with self.lock:
+            for expired_team_id in [key for key, entry in self.entries.items() if entry['expires_at'] <= now]:
+                self.entries.pop(expired_team_id)
+            self.entries[team_id] = {'roster': roster, 'posts': posts, 'expires_at': now + self.ttl}
+
+
+@shared_instance
+def get_scout_result_cache() -> ScoutResultCache:
+    """
+    Get the scout result cache shared by the process
+
+    :return: Shared scout result cache
+    """
+    return ScoutResultCache()
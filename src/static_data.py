@@ -0,0 +1,136 @@
+"""
+This file keeps the data dragon champion data in memory and refreshes it in the background when a new patch is released
+"""
+
+import asyncio
+import json
+import os
+import threading
+
+from champion_registry import ChampionRegistry
+from fetch_engine import get_fetch_engine
+from process_shared import create_parent_directory, shared_instance
+
+
+class StaticDataService:
+    """
+    Process wide holder of the champion data. Commands read the current registry while a background thread checks the
+    data dragon for new patches and swaps in the new registry once it has been downloaded
+    """
+    def __init__(self, path: str = '../extra_files/champion_info.json', refresh_interval: int = None):
+        """
+        Process wide holder of the champion data
+
+        :param path: Location of the saved champion info
+        :param refresh_interval: Number of seconds between each check for a new patch
+        """
+        self.path = path
+        self.refresh_interval = refresh_interval or int(os.getenv('STATIC_DATA_REFRESH_INTERVAL', 60 * 60))
+        self.fetch_engine = get_fetch_engine()
+        self.champion_registry = None
+        self.refreshing = False
+        self.stop_event = threading.Event()
+        self.refresh_thread = None
+
+    def start(self):
+        """
+        Load the saved champion data and start checking for new patches in the background
+        """
+        self.load()
+        if self.refresh_thread is None:
+            self.refresh_thread = threading.Thread(target=self.refresh_periodically, name='static_data', daemon=True)
+            self.refresh_thread.start()
+
+    def stop(self):
+        """
+        Stop checking for new patches
+        """
+        self.stop_event.set()
+
+    def load(self):
+        """
+        Load the saved champion data from disk if it exists
+        """
+        if self.champion_registry is None and os.path.isfile(self.path):
+            with open(self.path) as champion_info_file:
+                self.champion_registry = ChampionRegistry(json.load(champion_info_file))
+
+    def refresh_periodically(self):
+        """
+        Check for a new patch straight away and then once every refresh interval
+        """
+        while True:
+            try:
+                self.fetch_engine.run(self.refresh())
+            except Exception as exception:
+                print(f'Failed to refresh the champion info: {exception}')
+            if self.stop_event.wait(self.refresh_interval):
+                break
+
+    def request_refresh(self):
+        """
+        Check for a new patch in the background without waiting for the result. e.g. when an unknown champion is seen
+        """
+        asyncio.run_coroutine_threadsafe(self.refresh(), self.fetch_engine.loop)
+
+    async def refresh(self):
+        """
+        Download the champion data if the data dragon has a newer version than the one in memory
+        """
+        if self.refreshing:
+            return
+        self.refreshing = True
+        try:
+            version = (await self.fetch_engine.get_json('http://ddragon.leagueoflegends.com/api/versions.json'))[0]
+            if self.champion_registry is None or self.champion_registry.version != version:
+                await self.download_champion_info(version)
+        finally:
+            self.refreshing = False
+
+    async def download_champion_info(self, version: str):
+        """
+        Download the champion data for the given version, save it and swap it in for the current registry
+
+        :param version: Data dragon version. e.g. 14.10.1
+        """
+        print(f"Downloading champion info for {version}...")
+        champion_info = (await self.fetch_engine.get_json(f'http://ddragon.leagueoflegends.com/cdn/'
+                                                          f'{version}/data/en_US/champion.json'))['data']
+        self.save_champion_info(champion_info)
+        self.champion_registry = ChampionRegistry(champion_info)
+
+    def save_champion_info(self, champion_info: dict):
+        """
+        Save the champion data so it is available straight away the next time the bot starts
+
+        :param champion_info: Champion data from the data dragon
+        """
+        create_parent_directory(self.path)
+        with open(f'{self.path}.tmp', 'w') as champion_info_file:
+            json.dump(champion_info, champion_info_file)
+        os.replace(f'{self.path}.tmp', self.path)
+
+    async def get_champion_registry(self) -> ChampionRegistry:
+        """
+        Get the current champion registry. The data dragon is only waited on if there is no saved data at all
+
+        :return: Current champion registry
+        """
+        if self.champion_registry is None:
+            self.load()
+        while self.champion_registry is None:
+            if self.refreshing:
+                await asyncio.sleep(0.1)
+            else:
+                await self.refresh()
+        return self.champion_registry
+
+
+@shared_instance
+def get_static_data() -> StaticDataService:
+    """
+    Get the static data service shared by the process
+
+    :return: Shared static data service
+    """
+    return StaticDataService()
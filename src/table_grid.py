@@ -0,0 +1,95 @@
+"""
+This file lays out the cells of a table on a character grid so the renderer can place each cell without parsing text
+"""
+
+
+class TableGrid:
+    """
+    Titles and rows of a table along with the colour of every cell and the width of every column. The layout matches
+    the bordered tables prettytable creates, with each cell centred in its column
+    """
+    def __init__(self, titles: list, rows: list, colours: list = None, title_colours: list = None):
+        """
+        Titles and rows of a table along with the colour of every cell and the width of every column
+
+        :param titles: Name of each column
+        :param rows: Text of each cell, one list per row
+        :param colours: Colour name of each cell, one list per row. Empty or missing colours are left white
+        :param title_colours: Colour name of each title
+        """
+        self.titles = [str(title) for title in titles]
+        self.rows = [[str(cell) for cell in row] for row in rows]
+        self.colours = colours or []
+        self.title_colours = title_colours or []
+        self.column_widths = [max([len(self.titles[column])] + [len(row[column]) for row in self.rows
+                                                                  if column < len(row)])
+                              for column in range(len(self.titles))]
+
+        # Character offset of the left border of each column
+        self.column_starts = []
+        position = 0
+        for width in self.column_widths:
+            self.column_starts.append(position)
+            position += width + 3
+        self.line_width = position + 1
+
+    @property
+    def line_count(self) -> int:
+        """
+        Number of lines in the table: a border, the titles, a border, each row and a closing border
+        """
+        return len(self.rows) + 4
+
+    def get_border(self) -> str:
+        """
+        Get the border drawn above and below the titles and below the last row
+
+        :return: Border line. e.g. +-------+------+
+        """
+        return '+' + '+'.join('-' * (width + 2) for width in self.column_widths) + '+'
+
+    @staticmethod
+    def get_centred_offset(text: str, width: int) -> int:
+        """
+        Get the offset of the text when centred in the width. When the space cannot be split evenly odd length text
+        gets more space on the right and even length text more space on the left, the same as prettytable
+
+        :param text: Text of the cell
+        :param width: Width of the column
+        :return: Number of spaces before the text
+        """
+        excess = width - len(text)
+        if excess % 2 and len(text) % 2 == 0:
+            return excess // 2 + 1
+        return excess // 2
+
+    @staticmethod
+    def get_colour(colours: list, column: int) -> str:
+        """
+        Get the colour of a cell, or an empty string if it has none
+
+        :param colours: Colour name of each cell in the row
+        :param column: Index of the column
+        :return: Colour name of the cell. e.g. red
+        """
+        if colours and column < len(colours) and colours[column]:
+            return colours[column]
+        return ''
+
+    def get_cells(self) -> list:
+        """
+        Get the position and colour of every title and cell
+
+        :return: Tuple of the line, character offset, text and colour name of each title and cell
+        """
+        lines = [(1, self.titles, self.title_colours)]
+        for row_cnt, row in enumerate(self.rows):
+            lines.append((row_cnt + 3, row, self.colours[row_cnt] if row_cnt < len(self.colours) else []))
+
+        cells = []
+        for line, texts, colours in lines:
+            for column, width in enumerate(self.column_widths):
+                text = texts[column] if column < len(texts) else ''
+                offset = self.column_starts[column] + 2 + self.get_centred_offset(text, width)
+                cells.append((line, offset, text, self.get_colour(colours, column)))
+        return cells
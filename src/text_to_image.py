@@ -2,10 +2,13 @@
 This file will create an image from the input as a table
 """
 
-import prettytable
 import aws
+import render_service
 
-from PIL import Image, ImageDraw, ImageFont
+from metrics import get_metrics
+
+from render_resources import get_render_resources
+from table_grid import TableGrid
 
 
 class CreateImage:
@@ -19,23 +22,22 @@ class CreateImage:
 
         :param titles: List of names to use for the titles of each column
         :param rows: List of rows to add to the table
-        :param file_name: Name to save the file as
+        :param file_name: Name to upload the image as on AWS. e.g. 1234_player_ranks.png
         :param colour: Dual array of colours to colour each word in the table
         :param convert_columns: Convert the riven rows from columns into rows
         :param title_colours: Array of colours to paint the titles with
         """
         self.titles = titles
         self.rows = rows
-        self.table = None
-        self.table_to_image = None
+        self.grid = None
+        self.image = None
         self.file_name = file_name
         self.colour = colour
         self.convert_columns = convert_columns
         self.title_colours = title_colours
 
-        # Setup and add rows to the table
+        # Lay out the cells of the table
         self.setup()
-        self.add_rows()
 
         # Create the image from the table
         self.turn_into_image()
@@ -43,38 +45,26 @@ class CreateImage:
 
     def setup(self):
         """
-        Create the table object and add the titles
+        Convert the columns if needed and lay out the titles, rows and colours on a grid
         """
-        self.table = prettytable.PrettyTable()
-        self.table.field_names = self.titles
         if self.convert_columns:
             self.rows = self.convert_columns_to_rows(self.rows)
             if self.colour:
                 self.colour = self.convert_columns_to_rows(self.colour)
-
-    def add_rows(self):
-        """
-        Add each row to the table
-        """
-        for row in self.rows:
-            self.table.add_row(row)
+        self.grid = TableGrid(self.titles, self.rows, self.colour or None, self.title_colours or None)
 
     def turn_into_image(self):
         """
-        Turn the table into an image
+        Turn the table into an image in one of the render processes
         """
-        if self.title_colours:
-            self.table_to_image = TableToImage(self.table.get_string(), self.colour, self.rows, self.titles,
-                                               self.title_colours)
-        else:
-            self.table_to_image = TableToImage(self.table.get_string(), self.colour, self.rows)
+        with get_metrics().timer('image_render_seconds'):
+            self.image = render_service.get_render_service().render(self.grid)
 
     def save_image(self):
         """
-        Save the image as the given file name
+        Upload the image under the given file name without writing it to disk
         """
-        self.table_to_image.img.save(self.file_name)
-        aws.AWSHandler().upload_image(self.file_name)
+        aws.AWSHandler().upload_image(self.file_name, self.image)
 
     def convert_columns_to_rows(self, columns: list):
         """
@@ -117,130 +107,66 @@ class CreateImage:
 
 class TableToImage:
     """
-    Create an image from the text table given to it
+    Create an image from the grid of cells given to it
     """
 
-    def __init__(self, table: str, table_colour: list = False, original_rows: list = False, titles: list = False,
-                 title_colours: list = False):
+    def __init__(self, grid: TableGrid):
         """
-        Create an image from the text table given to it
+        Create an image from the grid of cells given to it
 
-        :param table: String of table to create
-        :param table_colour: Array of colour to print
-        :param original_rows: Array of original rows to use for colouring
-        :param titles: Name of each title if they need to be coloured
-        :param title_colours: What to colour each title
+        :param grid: Titles, rows, colours and column widths of the table
         """
         self.img = None
-        self.font = None
-        self.draw = None
-        self.processed = None
-        self.row_cnt = None
-        self.column_cnt = None
-        self.table = table
-        self.table_colour = table_colour
-        self.original_rows = original_rows
-        self.titles = titles
-        self.title_colours = title_colours
-        self.colour = None
-        self.word = None
-        self.colours = {
-            '': (255, 255, 255),
-            'red': (255, 0, 0),
-            'orange': (255, 106, 0),
-            'yellow': (255, 255, 0),
-            'blue': (50, 150, 255),
-            'green': (0, 153, 51),
-            'iron': (91, 82, 83),
-            'bronze': (136, 75, 48),
-            'silver': (134, 158, 166),
-            'gold': (201, 136, 52),
-            'platinum': (62, 121, 120),
-            'emerald': (2, 151, 57),
-            'diamond': (131, 184, 215),
-            'master': (146, 100, 182),
-            'grandmaster': (214, 51, 46),
-            'challenger': (255, 154, 43),
-            'black': (0, 0, 0),
-            'unranked': (255, 255, 255)
-        }
+        self.atlas = None
+        self.resources = None
+        self.canvas_cached = False
+        self.grid = grid
+        self.colours = None
 
         self.setup_image()
-        if table_colour:
-            self.colour_image()
-        if title_colours:
-            self.colour_titles()
+        self.draw_borders()
+        self.draw_cells()
 
-    def setup_image(self):
-        """
-        Basic setup for the image to set the size, font, background colour, and all of the text in black
+    def get_position(self, line: int, offset: int) -> tuple:
         """
-        # Create the correct size image for the table
-        rows = self.table.count('\n')
-        columns = self.table.split('\n')[0].count('-') + self.table.split('\n')[0].count('+')
-        self.img = Image.new('RGB', ((columns * 12) + 24, rows * 21 + 48), color=(36, 36, 41))  # Background
+        Get the pixel position of a character on the grid
 
-        # Initialize font and drawing object
-        self.font = ImageFont.truetype('../extra_files/cour.ttf', 20)
-        self.draw = ImageDraw.Draw(self.img)
-
-        # Draw the table without markings
-        for x in range(5):
-            self.draw.text((12, 12), self.table, font=self.font, fill=(255, 255, 255))
+        :param line: Line of the table the character is on
+        :param offset: Number of characters from the left of the table
+        :return: Pixel position of the top left of the character
+        """
+        return (offset * self.atlas.advance) + self.resources.margin, \
+            (line * self.atlas.line_height) + self.resources.margin
 
-    def colour_image(self):
+    def setup_image(self):
         """
-        Colour the image based on the array
+        Basic setup for the image to set the font, colours, size and background colour
         """
-        for row_cnt, colour_row in enumerate(self.table_colour):
-            self.processed = []
-            for column_cnt, colour in enumerate(colour_row):
-                self.row_cnt = row_cnt + 3
-                self.column_cnt = column_cnt
-                self.colour = colour
-                self.word = self.original_rows[self.row_cnt - 3][self.column_cnt]
-                self.colour_specific_word()
+        # The font, colours and blank canvases are loaded once per process
+        self.resources = get_render_resources()
+        self.atlas = self.resources.atlas
+        self.colours = self.resources.colours
+
+        # Copy a blank canvas of the correct size for the table
+        self.img, self.canvas_cached = self.resources.get_canvas(self.grid.line_width, self.grid.line_count)
 
-    def colour_titles(self):
+    def draw_borders(self):
         """
-        Colour the titles based on the information given
+        Draw the borders around the titles and rows, and the lines between each column
         """
-        self.processed = []
-        for colour_cnt, title_colour in enumerate(self.title_colours):
-            self.row_cnt = 1
-            self.word = self.titles[colour_cnt]
-            self.colour = title_colour
-            self.colour_specific_word()
+        border = self.grid.get_border()
+        for line in [0, 2, self.grid.line_count - 1]:
+            self.atlas.draw_text(self.img, self.get_position(line, 0), border, self.colours[''])
+        for line in [1] + list(range(3, self.grid.line_count - 1)):
+            for offset in self.grid.column_starts + [self.grid.line_width - 1]:
+                self.atlas.draw_text(self.img, self.get_position(line, offset), '|', self.colours[''])
 
-    def colour_specific_word(self):
+    def draw_cells(self):
         """
-        Colour the specific word based on the row and column count
+        Draw the text of each title and cell in its colour
         """
-        if self.colour != '':
-            row_string = self.table.split('\n')[self.row_cnt]
-
-            # If word only appears once
-            if row_string.count(self.word) == 1:
-                x_position = row_string.index(self.word)
-
-            # If the word appears multiple times
-            else:
-                x_position = [x_pos for x_pos in range(len(row_string)) if row_string.startswith(self.word, x_pos)
-                              and row_string[x_pos + len(self.word)] in [' ', '|'] and row_string[x_pos - 1] in
-                              [' ', '|']][self.processed.count(self.word)]
-
-            # Fill with black first
-            for x in range(5):
-                self.draw.text(((x_position * 12) + 12, (self.row_cnt * 21) + 12),
-                               self.word, font=self.font,
-                               fill=self.colours['black'])
-
-            # Fill with the desired colour
-            for x in range(5):
-                self.draw.text(((x_position * 12) + 12, (self.row_cnt * 21) + 12),
-                               self.word, font=self.font,
-                               fill=self.colours[self.colour])
-        self.processed.append(self.word)
+        for line, offset, text, colour in self.grid.get_cells():
+            self.atlas.draw_text(self.img, self.get_position(line, offset), text, self.colours[colour])
 
 
 if __name__ == '__main__':